@@ -1,5 +1,16 @@
+import logging
+import os
 import streamlit as st
-from database import Database
+from streamlit.runtime import Runtime
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+from barramento import obter_barramento
+from typing import Optional
+from cache import CacheConsultas
+from prefetch import AgendadorPrefetch
+from database import criar_database
+from dinheiro import Dinheiro
+from fornecedores import IndiceFornecedores, duplicados
+import perfil
 
 # Configuração da página
 st.set_page_config(
@@ -8,6 +19,116 @@ st.set_page_config(
     layout="wide"
 )
 
+def _rerun_da_sessao():
+    # Pede um rerun desta sessão quando outra sessão (ou processo) altera dados
+    ctx = get_script_run_ctx()
+    if ctx is None:
+        return None
+    session_id = ctx.session_id
+
+    def pedir_rerun(mudanca):
+        atual = get_script_run_ctx()
+        if atual is not None and atual.session_id == session_id:
+            return  # A própria sessão fez a escrita e já está rodando
+        try:
+            _solicitar_rerun(session_id)
+        except Exception as e:
+            logging.error(f"Erro ao pedir rerun da sessão: {e}")
+
+    return pedir_rerun
+
+def _solicitar_rerun(session_id: str):
+    # O Streamlit (1.45) não tem API pública para pedir o rerun de outra
+    # sessão; usamos as mesmas partes internas do "run on save": o
+    # gerenciador de sessões do Runtime e o ClientState da última execução,
+    # que preserva query string (?perfil=1), página e widgets. Com
+    # request_rerun(None) o rerun sairia sem a query string. Se essa API
+    # interna mudar, o erro é registrado e só o rerun automático deixa de
+    # acontecer.
+    info = Runtime.instance()._session_mgr.get_active_session_info(session_id)
+    if info is None:
+        return
+    sessao = info.session
+    sessao.request_rerun(sessao._client_state)
+
+def obter_cache() -> CacheConsultas:
+    # Cache por sessão, invalidado pelas escritas de qualquer sessão
+    if 'cache' not in st.session_state:
+        rerun_automatico = os.getenv("CAZAR_RERUN_AUTOMATICO") == "1"
+        cache = CacheConsultas(ao_invalidar=_rerun_da_sessao() if rerun_automatico else None)
+        obter_barramento().assinar(cache.invalidar)
+        st.session_state.cache = cache
+    return st.session_state.cache
+
+def _consultas():
+    # chave no cache -> (função de carga, dependências)
+    db = st.session_state.db
+    return {
+        "demandas": (db.obter_demandas, [("Demandas", None)]),
+        "resumos": (db.obter_resumos_orcamentos, [("ResumoOrcamentos", None)]),
+        "gastos": (db.obter_gastos, [("Gastos", None)]),
+        "fornecedores": (lambda: carregar_indice_fornecedores(db), [("Orcamentos", None)]),
+        # Agrupamento é caro (segundos com 100k orçamentos): fica no cache
+        # junto do índice e só é refeito quando os orçamentos mudam
+        "grupos_fornecedores": (agrupar_fornecedores, [("Orcamentos", None)]),
+    }
+
+# Consultas feitas por cada página do menu lateral
+CONSULTAS_POR_PAGINA = {
+    "Demandas": ["demandas"],
+    "Orçamentos": ["demandas", "fornecedores"],
+    "Relatório Financeiro": ["gastos"],
+}
+
+def _carregar(chave):
+    carregar, dependencias = _consultas()[chave]
+    cache = obter_cache()
+    valor = cache.obter(chave, carregar, dependencias)
+    # Banco fora do ar (disjuntor aberto): exibe a última versão carregada
+    if valor is None and not st.session_state.db.disponivel:
+        reserva = cache.obter_reserva(chave)
+        if reserva is not None:
+            st.session_state.dados_desatualizados = True
+            return reserva
+    return valor
+
+def carregar_demandas():
+    return _carregar("demandas")
+
+def carregar_resumos():
+    return _carregar("resumos")
+
+def carregar_gastos():
+    return _carregar("gastos")
+
+def carregar_indice_fornecedores(db) -> Optional[IndiceFornecedores]:
+    # None (não guardado no cache) se a consulta falhar; sem orçamentos o
+    # índice vazio é guardado normalmente
+    contagens = db.obter_fornecedores()
+    return IndiceFornecedores(contagens) if contagens is not None else None
+
+def carregar_fornecedores() -> Optional[IndiceFornecedores]:
+    return _carregar("fornecedores")
+
+def agrupar_fornecedores():
+    indice = carregar_fornecedores()
+    return duplicados(indice.agrupar()) if indice is not None else None
+
+def carregar_grupos_fornecedores():
+    return _carregar("grupos_fornecedores")
+
+def obter_prefetch() -> Optional[AgendadorPrefetch]:
+    # CAZAR_PREFETCH=0 desliga o prefetch das outras páginas
+    if os.getenv("CAZAR_PREFETCH") == "0":
+        return None
+    if 'prefetch' not in st.session_state:
+        consultas = _consultas()
+        st.session_state.prefetch = AgendadorPrefetch(obter_cache(), {
+            pagina: [(chave, *consultas[chave]) for chave in chaves]
+            for pagina, chaves in CONSULTAS_POR_PAGINA.items()
+        })
+    return st.session_state.prefetch
+
 def cadastrar_demanda():
     st.subheader("Cadastro de Demandas")
     
@@ -29,12 +150,8 @@ def cadastrar_demanda():
                     return
                 
                 # Tratamento do valor
-                valor_limpo = valor.replace("R$", "").replace(".", "").replace(",", ".").strip()
-                if not valor_limpo:
-                    valor_limpo = "0"
-                    
                 try:
-                    valor_float = float(valor_limpo)
+                    valor_dinheiro = Dinheiro.de_texto(valor) if valor.strip() else Dinheiro()
                 except ValueError:
                     st.error("❌ Formato de valor inválido!")
                     st.info("💡 Use apenas números, exemplo: 1500,00")
@@ -45,7 +162,7 @@ def cadastrar_demanda():
                     nome=nome,
                     descricao=descricao,
                     prioridade=str(prioridade),
-                    valor=valor_float
+                    valor=valor_dinheiro
                 ):
                     st.success("✅ Demanda cadastrada com sucesso!")
                     # Força atualização da lista de demandas
@@ -57,38 +174,114 @@ def cadastrar_demanda():
 
 def listar_demandas():
     try:
-        demandas = st.session_state.db.obter_demandas()
+        with perfil.secao("obter_demandas"):
+            demandas = carregar_demandas()
         
         if not demandas:
             st.info("📝 Nenhuma demanda cadastrada.")
             return
 
-        for demanda in demandas:
-            with st.expander(f"{demanda.nome} (Prioridade: {demanda.prioridade})"):
-                st.write(f"**Descrição:** {demanda.descricao}")
-                st.write(f"**Status:** {demanda.status}")
-                st.write(f"**Valor:** R$ {demanda.valor:,.2f}")
-                st.write(f"**Data:** {demanda.data_criacao.strftime('%d/%m/%Y %H:%M')}")
-                
-                col1, col2 = st.columns(2)
-                with col1:
-                    if st.button("✏️ Editar", key=f"edit_{demanda.id}"):
-                        st.session_state.demanda_para_editar = demanda
-                with col2:
-                    if st.button("❌ Excluir", key=f"del_{demanda.id}"):
-                        if st.session_state.db.excluir_demanda(demanda.id):
-                            st.success("Demanda excluída com sucesso!")
-                            st.rerun()
+        # Uma consulta para todos os resumos de orçamentos
+        with perfil.secao("obter_resumos_orcamentos"):
+            resumos = carregar_resumos() or {}
+
+        with perfil.secao("render_demandas"):
+            _renderizar_demandas(demandas, resumos)
                 
     except Exception as e:
         st.error("❌ Erro ao listar demandas")
         st.error(f"Detalhes: {str(e)}")
 
+def _renderizar_demandas(demandas, resumos):
+    for demanda in demandas:
+        with st.expander(f"{demanda.nome} (Prioridade: {demanda.prioridade})"):
+            st.write(f"**Descrição:** {demanda.descricao}")
+            st.write(f"**Status:** {demanda.status}")
+            st.write(f"**Valor:** {demanda.valor}")
+            st.write(f"**Data:** {demanda.data_criacao.strftime('%d/%m/%Y %H:%M')}")
+
+            resumo = resumos.get(demanda.id)
+            if resumo:
+                st.write(
+                    f"**Orçamentos:** {resumo.quantidade} | "
+                    f"Menor: {resumo.valor_minimo} | "
+                    f"Média: {resumo.valor_medio}"
+                )
+            
+            col1, col2 = st.columns(2)
+            with col1:
+                if st.button("✏️ Editar", key=f"edit_{demanda.id}"):
+                    st.session_state.demanda_para_editar = demanda
+            with col2:
+                if st.button("❌ Excluir", key=f"del_{demanda.id}"):
+                    if st.session_state.db.excluir_demanda(demanda.id):
+                        st.success("Demanda excluída com sucesso!")
+                        st.rerun()
+
+def gerenciar_demandas_em_lote():
+    with st.expander("🧹 Ações em lote"):
+        demandas = carregar_demandas()
+        if not demandas:
+            st.info("📝 Nenhuma demanda cadastrada.")
+            return
+
+        selecionadas = st.multiselect(
+            "Demandas",
+            demandas,
+            format_func=lambda x: f"{x.nome} ({x.status})"
+        )
+        novo_status = st.selectbox(
+            "Novo status",
+            ["Pendente", "Em Andamento", "Concluído"]
+        )
+        ids = [d.id for d in selecionadas]
+
+        col1, col2 = st.columns(2)
+        with col1:
+            if st.button("🔄 Atualizar status", disabled=not ids):
+                total = st.session_state.db.atualizar_demandas(ids=ids, status=novo_status)
+                if total is not None:
+                    st.success(f"{total} demanda(s) atualizada(s)!")
+                    st.session_state.update_demandas = True
+        with col2:
+            # Exclui também todos os orçamentos das demandas: pede confirmação.
+            # O rótulo muda com a seleção, o que desmarca a confirmação.
+            confirmado = st.checkbox(
+                f"Confirmo a exclusão de {len(ids)} demanda(s) e de seus orçamentos",
+                disabled=not ids
+            )
+            if st.button("❌ Excluir selecionadas", disabled=not (ids and confirmado)):
+                resultado = st.session_state.db.deletar_demandas(ids=ids)
+                if resultado is not None:
+                    st.success(
+                        f"{resultado.demandas} demanda(s) e "
+                        f"{resultado.orcamentos} orçamento(s) excluídos!"
+                    )
+                    st.session_state.update_demandas = True
+
+def escolher_fornecedor(demanda_id) -> str:
+    # Fica fora do form para as sugestões acompanharem a digitação
+    fornecedor = st.text_input("Fornecedor", key=f"fornecedor_{demanda_id}")
+    indice = carregar_fornecedores() if fornecedor else None
+    if not indice:
+        return fornecedor
+
+    sugestoes = [s for s in indice.sugerir(fornecedor) if s != fornecedor]
+    if not sugestoes:
+        return fornecedor
+    return st.radio(
+        "Fornecedores já cadastrados parecidos",
+        [fornecedor] + sugestoes,
+        format_func=lambda x: f"Novo: {x}" if x == fornecedor else x,
+        horizontal=True,
+        key=f"sugestao_fornecedor_{demanda_id}"
+    )
+
 def cadastrar_orcamento(demanda_id):
+    st.subheader("Novo Orçamento")
+    fornecedor = escolher_fornecedor(demanda_id)
+
     with st.form(f"form_orcamento_{demanda_id}", clear_on_submit=True):
-        st.subheader("Novo Orçamento")
-        
-        fornecedor = st.text_input("Fornecedor")
         descricao = st.text_area("Descrição do Orçamento")
         valor = st.text_input("Valor (R$)", "0,00")
         
@@ -102,9 +295,8 @@ def cadastrar_orcamento(demanda_id):
                     return
                 
                 # Tratamento do valor
-                valor_limpo = valor.replace("R$", "").replace(".", "").replace(",", ".").strip()
                 try:
-                    valor_float = float(valor_limpo)
+                    valor_dinheiro = Dinheiro.de_texto(valor)
                 except ValueError:
                     st.error("❌ Formato de valor inválido!")
                     st.info("💡 Use apenas números, exemplo: 1500,00")
@@ -115,7 +307,7 @@ def cadastrar_orcamento(demanda_id):
                     demanda_id=demanda_id,
                     fornecedor=fornecedor,
                     descricao=descricao,
-                    valor=valor_float
+                    valor=valor_dinheiro
                 ):
                     st.success("✅ Orçamento cadastrado com sucesso!")
                     st.session_state.update_demandas = True
@@ -124,7 +316,57 @@ def cadastrar_orcamento(demanda_id):
                 st.error("❌ Erro ao cadastrar orçamento")
                 st.error(f"Detalhes: {str(e)}")
 
+def unificar_fornecedores():
+    with st.expander("🔎 Fornecedores duplicados"):
+        if not st.checkbox("Procurar grafias diferentes do mesmo fornecedor"):
+            return
+        grupos = carregar_grupos_fornecedores()
+        if not grupos:
+            st.info("Nenhum fornecedor duplicado encontrado.")
+            return
+
+        renomear = {}
+        for i, grupo in enumerate(grupos):
+            canonico = st.selectbox(
+                f"{len(grupo.variantes)} grafias, {grupo.total} orçamento(s)",
+                list(grupo.variantes),
+                index=list(grupo.variantes).index(grupo.canonico),
+                format_func=lambda x, g=grupo: f"{x} ({g.variantes[x]})",
+                key=f"grupo_fornecedor_{i}"
+            )
+            # Grupos são aproximados e a renomeação é definitiva: o usuário
+            # marca cada grupo que quer unificar
+            if st.checkbox("Unificar", value=False, key=f"unificar_fornecedor_{i}"):
+                renomear.update({nome: canonico for nome in grupo.variantes})
+
+        if st.button("Unificar fornecedores", disabled=not renomear):
+            total = st.session_state.db.unificar_fornecedores(renomear)
+            if total is not None:
+                st.success(f"{total} orçamento(s) atualizado(s)!")
+
+def avisar_banco_indisponivel(aviso):
+    # No topo da página, depois de saber se alguma consulta usou a reserva
+    db = st.session_state.get('db')
+    if db is None or db.disponivel:
+        return
+    if st.session_state.pop('dados_desatualizados', False):
+        aviso.warning("⚠️ Banco de dados indisponível. Exibindo os últimos dados carregados; "
+                   "alterações não serão salvas até a conexão voltar.")
+    else:
+        aviso.warning("⚠️ Banco de dados indisponível. Tentando reconectar...")
+
 def main():
+    aviso = st.empty()
+    with perfil.rerun() as perfilador:
+        renderizar_app()
+    avisar_banco_indisponivel(aviso)
+    perfil.exibir_no_sidebar(perfilador)
+    if perfilador and st.session_state.get('prefetch'):
+        st.sidebar.caption(st.session_state.prefetch.resumo())
+    if perfilador and st.session_state.get('db'):
+        st.sidebar.caption(st.session_state.db.resiliencia.resumo())
+
+def renderizar_app():
     # Inicialização do estado da sessão
     if 'update_demandas' not in st.session_state:
         st.session_state.update_demandas = False
@@ -134,10 +376,15 @@ def main():
     try:
         # Inicializa conexão com banco de dados
         if 'db' not in st.session_state:
-            st.session_state.db = Database()
+            with perfil.secao("criar_database"):
+                st.session_state.db = criar_database()
 
         db = st.session_state.db
 
+        # Mudanças feitas em outras sessões também exibem a lista atualizada
+        if obter_cache().consumir_alteracao("Demandas", "ResumoOrcamentos"):
+            st.session_state.update_demandas = True
+
         # Menu lateral
         st.sidebar.title("Menu")
         opcao = st.sidebar.selectbox(
@@ -147,16 +394,20 @@ def main():
 
         if opcao == "Demandas":
             cadastrar_demanda()
+            with perfil.secao("gerenciar_demandas_em_lote"):
+                gerenciar_demandas_em_lote()
 
             # Lista de demandas (atualiza quando necessário)
             if st.session_state.update_demandas:
-                listar_demandas()
+                with perfil.secao("listar_demandas"):
+                    listar_demandas()
                 st.session_state.update_demandas = False
 
         elif opcao == "Orçamentos":
             st.header("Gestão de Orçamentos")
             
-            demandas = db.obter_demandas()
+            with perfil.secao("obter_demandas"):
+                demandas = carregar_demandas()
             if demandas:
                 demanda_selecionada = st.selectbox(
                     "Selecione a demanda",
@@ -165,7 +416,9 @@ def main():
                 )
                 
                 cadastrar_orcamento(demanda_selecionada.id)
-        
+                with perfil.secao("unificar_fornecedores"):
+                    unificar_fornecedores()
+
             else:
                 st.warning("Cadastre algumas demandas primeiro!")
 
@@ -174,22 +427,37 @@ def main():
             
             with st.form("novo_gasto"):
                 descricao_gasto = st.text_input("Descrição do Gasto")
-                valor_gasto = st.number_input("Valor", min_value=0.0, step=100.0)
+                valor_gasto = st.text_input("Valor (R$)", "0,00")
                 
                 if st.form_submit_button("Registrar Gasto"):
-                    if db.inserir_gasto(descricao_gasto, valor_gasto):
-                        st.success("Gasto registrado com sucesso!")
+                    try:
+                        valor_dinheiro = Dinheiro.de_texto(valor_gasto)
+                    except ValueError:
+                        st.error("❌ Formato de valor inválido!")
+                        st.info("💡 Use apenas números, exemplo: 1500,00")
+                    else:
+                        if valor_dinheiro < Dinheiro():
+                            st.error("❌ O valor não pode ser negativo!")
+                        elif db.inserir_gasto(descricao_gasto, valor_dinheiro):
+                            st.success("Gasto registrado com sucesso!")
         
             # Exibir gastos
             st.subheader("Gastos Registrados")
-            gastos = db.obter_gastos()
-            total = sum(g.valor for g in gastos)
-            st.metric("Total de Gastos", f"R$ {total:,.2f}")
+            with perfil.secao("obter_gastos"):
+                gastos = carregar_gastos() or []
+            total = sum((g.valor for g in gastos), Dinheiro())
+            st.metric("Total de Gastos", str(total))
             
-            for g in gastos:
-                st.write(f"**{g.descricao}**: R$ {g.valor:,.2f}")
-                st.write(f"Data: {g.data.strftime('%d/%m/%Y %H:%M')}")
-                st.write("---")
+            with perfil.secao("render_gastos"):
+                for g in gastos:
+                    st.write(f"**{g.descricao}**: {g.valor}")
+                    st.write(f"Data: {g.data.strftime('%d/%m/%Y %H:%M')}")
+                    st.write("---")
+
+        # Página pronta: carrega em segundo plano os dados das próximas
+        prefetch = obter_prefetch()
+        if prefetch:
+            prefetch.pagina_exibida(opcao)
 
         st.sidebar.markdown("---")
         st.sidebar.markdown("### Desenvolvido com ❤️")
@@ -0,0 +1,221 @@
+"""Backup incremental de Demandas, Orcamentos e Gastos.
+
+As tabelas são divididas em blocos por faixa de id (``id / tamanho_bloco``).
+Para cada bloco o servidor calcula (linhas, CHECKSUM_AGG(BINARY_CHECKSUM(...)))
+numa única consulta agrupada; só os blocos cujo par mudou desde o último
+backup são lidos. O tempo do backup acompanha o volume de mudanças, não o
+tamanho das tabelas.
+
+Cada bloco lido é gravado comprimido em ``objetos/``, endereçado pelo sha256 do
+conteúdo (blocos iguais são gravados uma vez só). Cada backup grava um
+manifesto completo em ``manifestos/`` apontando para os objetos de todos os
+blocos, então restaurar qualquer ponto no tempo é ler um manifesto só.
+
+Todas as leituras de um backup são feitas numa única transação (SNAPSHOT no SQL
+Server, BEGIN no SQLite em WAL): o manifesto é o retrato de um instante, mesmo
+com escritas acontecendo durante o backup.
+
+O checksum do SQL Server pode não perceber algumas mudanças (colisões do
+BINARY_CHECKSUM); ``--completo`` relê todos os blocos.
+
+Uso:
+    python backup.py fazer [--diretorio backups] [--completo]
+    python backup.py listar
+    python backup.py restaurar [--manifesto NOME] [--sqlite destino.db]
+"""
+import argparse
+import hashlib
+import json
+import os
+import time
+import zlib
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from database import TABELAS_BACKUP, Database, DatabaseLocal, criar_database
+
+COLUNAS_DATA = {"data_criacao", "data"}
+VERSAO_MANIFESTO = 1
+
+@dataclass
+class ResultadoBackup:
+    manifesto: str
+    blocos_lidos: int = 0
+    blocos_reaproveitados: int = 0
+    linhas_lidas: int = 0
+    bytes_gravados: int = 0
+    segundos: float = 0.0
+
+def _serializar(linhas: List[tuple]) -> bytes:
+    return json.dumps(
+        linhas, separators=(",", ":"), ensure_ascii=False,
+        default=lambda v: v.isoformat() if isinstance(v, datetime) else str(v)
+    ).encode()
+
+def _desserializar(tabela: str, dados: bytes) -> List[tuple]:
+    datas = [i for i, c in enumerate(TABELAS_BACKUP[tabela]) if c in COLUNAS_DATA]
+    linhas = []
+    for linha in json.loads(dados):
+        for i in datas:
+            if linha[i] is not None:
+                linha[i] = datetime.fromisoformat(linha[i])
+        linhas.append(tuple(linha))
+    return linhas
+
+def _gravar_atomico(caminho: str, dados: bytes):
+    temporario = caminho + ".tmp"
+    with open(temporario, "wb") as f:
+        f.write(dados)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporario, caminho)
+
+class Backup:
+    def __init__(self, db: Database, diretorio: str = "backups", tamanho_bloco: int = 1000):
+        self.db = db
+        self.diretorio = diretorio
+        self.tamanho_bloco = tamanho_bloco
+        self._objetos = os.path.join(diretorio, "objetos")
+        self._manifestos = os.path.join(diretorio, "manifestos")
+        os.makedirs(self._objetos, exist_ok=True)
+        os.makedirs(self._manifestos, exist_ok=True)
+
+    def manifestos(self) -> List[str]:
+        # Do mais antigo ao mais recente (o nome é o instante do backup)
+        return sorted(
+            nome[:-len(".json")] for nome in os.listdir(self._manifestos)
+            if nome.endswith(".json")
+        )
+
+    def ler_manifesto(self, nome: Optional[str] = None) -> Optional[dict]:
+        nomes = self.manifestos()
+        if nome is None:
+            if not nomes:
+                return None
+            nome = nomes[-1]
+        with open(os.path.join(self._manifestos, nome + ".json"), "rb") as f:
+            return json.load(f)
+
+    def _caminho_objeto(self, sha: str) -> str:
+        return os.path.join(self._objetos, sha[:2], sha)
+
+    def _gravar_objeto(self, dados: bytes) -> Tuple[str, int]:
+        sha = hashlib.sha256(dados).hexdigest()
+        caminho = self._caminho_objeto(sha)
+        if os.path.exists(caminho):
+            return sha, 0
+        os.makedirs(os.path.dirname(caminho), exist_ok=True)
+        comprimido = zlib.compress(dados, 6)
+        _gravar_atomico(caminho, comprimido)
+        return sha, len(comprimido)
+
+    def _ler_objeto(self, sha: str) -> bytes:
+        with open(self._caminho_objeto(sha), "rb") as f:
+            dados = zlib.decompress(f.read())
+        if hashlib.sha256(dados).hexdigest() != sha:
+            raise ValueError(f"Objeto de backup corrompido: {sha}")
+        return dados
+
+    def fazer(self, completo: bool = False) -> ResultadoBackup:
+        inicio = time.perf_counter()
+        nomes = self.manifestos()
+        nome_anterior = nomes[-1] if nomes and not completo else None
+        anterior = self.ler_manifesto(nome_anterior) if nome_anterior else None
+        if anterior and anterior["tamanho_bloco"] != self.tamanho_bloco:
+            anterior = nome_anterior = None
+
+        nome = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+        resultado = ResultadoBackup(nome)
+        tabelas = {}
+        # Todas as tabelas no mesmo instante: com leituras separadas, uma
+        # demanda e seu orçamento gravados durante o backup poderiam entrar
+        # só pela metade (orçamento sem a demanda) e a restauração falharia
+        with self.db.leitura_consistente() as cursor:
+            for tabela in TABELAS_BACKUP:
+                blocos_anteriores = anterior["tabelas"].get(tabela, {}) if anterior else {}
+                blocos = {}
+                for bloco, (linhas, checksum) in sorted(
+                    self.db.somas_por_bloco(cursor, tabela, self.tamanho_bloco).items()
+                ):
+                    chave = str(bloco)
+                    registrado = blocos_anteriores.get(chave)
+                    if registrado and registrado[0] == linhas and registrado[1] == checksum:
+                        blocos[chave] = registrado
+                        resultado.blocos_reaproveitados += 1
+                        continue
+
+                    conteudo = self.db.linhas_do_bloco(
+                        cursor, tabela,
+                        bloco * self.tamanho_bloco, (bloco + 1) * self.tamanho_bloco
+                    )
+                    sha, gravados = self._gravar_objeto(_serializar(conteudo))
+                    blocos[chave] = [linhas, checksum, sha]
+                    resultado.blocos_lidos += 1
+                    resultado.linhas_lidas += len(conteudo)
+                    resultado.bytes_gravados += gravados
+                tabelas[tabela] = blocos
+
+        manifesto = {
+            "versao": VERSAO_MANIFESTO,
+            "criado_em": datetime.now().isoformat(),
+            "anterior": nome_anterior,
+            "tamanho_bloco": self.tamanho_bloco,
+            "tabelas": tabelas,
+        }
+        _gravar_atomico(
+            os.path.join(self._manifestos, nome + ".json"),
+            json.dumps(manifesto, indent=1).encode()
+        )
+        resultado.segundos = time.perf_counter() - inicio
+        return resultado
+
+    def restaurar(self, destino: Database, nome: Optional[str] = None) -> int:
+        # Substitui o conteúdo do destino pelo estado do manifesto (o último,
+        # se nenhum for informado); devolve o número de linhas restauradas
+        manifesto = self.ler_manifesto(nome)
+        if manifesto is None:
+            raise ValueError("Nenhum backup encontrado")
+
+        linhas_por_tabela: Dict[str, List[tuple]] = {}
+        for tabela, blocos in manifesto["tabelas"].items():
+            linhas = []
+            for chave in sorted(blocos, key=int):
+                linhas.extend(_desserializar(tabela, self._ler_objeto(blocos[chave][2])))
+            linhas_por_tabela[tabela] = linhas
+        return destino.restaurar_tabelas(linhas_por_tabela)
+
+def main():
+    parser = argparse.ArgumentParser(description="Backup dos dados do Gestor de Casamento")
+    parser.add_argument("acao", choices=["fazer", "listar", "restaurar"])
+    parser.add_argument("--diretorio", default="backups")
+    parser.add_argument("--tamanho-bloco", type=int, default=1000)
+    parser.add_argument("--completo", action="store_true",
+                        help="Relê todos os blocos em vez de só os alterados")
+    parser.add_argument("--manifesto", help="Backup a restaurar (padrão: o último)")
+    parser.add_argument("--sqlite", help="Restaura neste arquivo SQLite em vez do banco atual")
+    args = parser.parse_args()
+
+    if args.acao == "restaurar" and args.sqlite:
+        db = DatabaseLocal(args.sqlite)
+    else:
+        db = criar_database()  # CAZAR_SQLITE também vale aqui
+    backup = Backup(db, args.diretorio, args.tamanho_bloco)
+
+    if args.acao == "fazer":
+        r = backup.fazer(args.completo)
+        print(
+            f"Backup {r.manifesto}: {r.blocos_lidos} bloco(s) lido(s), "
+            f"{r.blocos_reaproveitados} reaproveitado(s), {r.linhas_lidas} linha(s), "
+            f"{r.bytes_gravados / 1024:.1f} KiB gravados em {r.segundos:.2f}s"
+        )
+    elif args.acao == "listar":
+        for nome in backup.manifestos():
+            print(nome)
+    else:
+        inicio = time.perf_counter()
+        total = backup.restaurar(db, args.manifesto)
+        print(f"{total} linha(s) restaurada(s) em {time.perf_counter() - inicio:.2f}s")
+
+if __name__ == "__main__":
+    main()
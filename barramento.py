@@ -0,0 +1,174 @@
+import json
+import logging
+import os
+import threading
+import types
+import uuid
+import weakref
+from dataclasses import asdict, dataclass
+from typing import Callable, Iterable, List, Optional
+
+# Barramento de mudanças em processo: os métodos de escrita do Database
+# publicam (tabela, id, operação) e caches/sessões assinam para invalidar só
+# o que mudou. Com CAZAR_BARRAMENTO_ARQUIVO definido, as mudanças também são
+# trocadas entre processos através de um arquivo compartilhado.
+
+TODAS = "*"
+
+@dataclass(frozen=True)
+class Mudanca:
+    tabela: str
+    id: Optional[int]  # None: várias linhas (filtro, lote, reconstrução)
+    operacao: str      # inserir, atualizar, deletar, reconstruir
+    origem: str = ""
+
+class _Assinatura:
+    def __init__(self, callback: Callable[[Mudanca], None],
+                 tabelas: Optional[Iterable[str]]):
+        # Métodos ligados são guardados por referência fraca: quando a sessão
+        # (e seu cache) some, a assinatura some junto
+        if isinstance(callback, types.MethodType):
+            self._ref = weakref.WeakMethod(callback)
+        else:
+            self._ref = lambda: callback
+        self.tabelas = set(tabelas) if tabelas else None
+
+    def callback(self):
+        return self._ref()
+
+    def aceita(self, mudanca: Mudanca) -> bool:
+        return (
+            self.tabelas is None
+            or mudanca.tabela == TODAS
+            or mudanca.tabela in self.tabelas
+        )
+
+class BarramentoMudancas:
+    def __init__(self):
+        self.origem = uuid.uuid4().hex
+        self._assinaturas: List[_Assinatura] = []
+        self._lock = threading.Lock()
+        self.transporte = None
+
+    def assinar(self, callback: Callable[[Mudanca], None],
+                tabelas: Optional[Iterable[str]] = None) -> Callable[[], None]:
+        assinatura = _Assinatura(callback, tabelas)
+        with self._lock:
+            self._assinaturas.append(assinatura)
+
+        def cancelar():
+            with self._lock:
+                if assinatura in self._assinaturas:
+                    self._assinaturas.remove(assinatura)
+        return cancelar
+
+    def publicar(self, tabela: str, id: Optional[int], operacao: str):
+        mudanca = Mudanca(tabela, id, operacao, self.origem)
+        self.entregar(mudanca)
+        if self.transporte:
+            self.transporte.enviar(mudanca)
+
+    def entregar(self, mudanca: Mudanca):
+        with self._lock:
+            assinaturas = list(self._assinaturas)
+
+        mortas = []
+        for assinatura in assinaturas:
+            callback = assinatura.callback()
+            if callback is None:
+                mortas.append(assinatura)
+                continue
+            if not assinatura.aceita(mudanca):
+                continue
+            try:
+                callback(mudanca)
+            except Exception as e:
+                logging.error(f"Erro ao entregar mudança {mudanca}: {e}")
+
+        if mortas:
+            with self._lock:
+                self._assinaturas = [a for a in self._assinaturas if a not in mortas]
+
+    @property
+    def total_assinaturas(self) -> int:
+        return len(self._assinaturas)
+
+class TransporteArquivo:
+    # Cada processo acrescenta suas mudanças como linhas JSON num arquivo
+    # compartilhado e acompanha o final dele numa thread. Escritas pequenas com
+    # O_APPEND são atômicas no POSIX, então não há lock entre processos.
+    def __init__(self, barramento: BarramentoMudancas, caminho: str,
+                 intervalo: float = 0.2, tamanho_maximo: int = 1024 * 1024):
+        self.barramento = barramento
+        self.caminho = caminho
+        self.intervalo = intervalo
+        self.tamanho_maximo = tamanho_maximo
+        self._parar = threading.Event()
+
+        # Só interessam as mudanças publicadas a partir de agora
+        with open(caminho, "ab"):
+            pass
+        self._posicao = os.path.getsize(caminho)
+        self._thread = threading.Thread(
+            target=self._acompanhar, name="barramento-arquivo", daemon=True
+        )
+        self._thread.start()
+
+    def enviar(self, mudanca: Mudanca):
+        linha = (json.dumps(asdict(mudanca), ensure_ascii=False) + "\n").encode("utf-8")
+        try:
+            fd = os.open(self.caminho, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                # Arquivo grande demais: recomeça. Leitores percebem o
+                # encolhimento e invalidam tudo por segurança.
+                if os.fstat(fd).st_size > self.tamanho_maximo:
+                    os.ftruncate(fd, 0)
+                os.write(fd, linha)
+            finally:
+                os.close(fd)
+        except OSError as e:
+            logging.error(f"Erro ao enviar mudança pelo arquivo: {e}")
+
+    def _acompanhar(self):
+        while not self._parar.wait(self.intervalo):
+            try:
+                self._ler_novas()
+            except Exception as e:
+                logging.error(f"Erro ao ler mudanças do arquivo: {e}")
+
+    def _ler_novas(self):
+        tamanho = os.path.getsize(self.caminho)
+        if tamanho < self._posicao:
+            self._posicao = 0
+            self.barramento.entregar(Mudanca(TODAS, None, "reconstruir"))
+        if tamanho == self._posicao:
+            return
+
+        with open(self.caminho, "rb") as f:
+            f.seek(self._posicao)
+            dados = f.read()
+
+        # Linha incompleta fica para a próxima leitura
+        fim = dados.rfind(b"\n") + 1
+        self._posicao += fim
+        for linha in dados[:fim].splitlines():
+            mudanca = Mudanca(**json.loads(linha))
+            if mudanca.origem != self.barramento.origem:
+                self.barramento.entregar(mudanca)
+
+    def parar(self):
+        self._parar.set()
+        self._thread.join()
+
+_barramento = None
+_barramento_lock = threading.Lock()
+
+def obter_barramento() -> BarramentoMudancas:
+    global _barramento
+    with _barramento_lock:
+        if _barramento is None:
+            _barramento = BarramentoMudancas()
+            caminho = os.getenv("CAZAR_BARRAMENTO_ARQUIVO")
+            if caminho:
+                _barramento.transporte = TransporteArquivo(_barramento, caminho)
+        return _barramento
@@ -0,0 +1,70 @@
+"""Microbenchmark do caminho de dinheiro: Dinheiro (centavos) x Decimal.
+
+Compara, para N valores, as etapas que o app percorre: interpretar o texto
+digitado, converter a linha lida do banco, somar e formatar para exibição.
+O caminho Decimal reproduz o código anterior (str.replace encadeado e
+Decimal(str(...)) na leitura); na exibição usa o mesmo formato pt-BR
+("R$ 1.500,00") para a comparação ser justa.
+
+Uso:
+    python bench_dinheiro.py --valores 100000 --repeticoes 5
+"""
+import argparse
+import random
+import timeit
+from decimal import Decimal
+
+from dinheiro import Dinheiro, centavos_de_texto, formatar_lote, parsear_lote, somar
+
+def _textos(n: int):
+    aleatorio = random.Random(42)
+    return [
+        f"R$ {aleatorio.randrange(10_000_000):_},{aleatorio.randrange(100):02d}".replace("_", ".")
+        for _ in range(n)
+    ]
+
+def casos(n: int):
+    textos = _textos(n)
+    centavos = [centavos_de_texto(t) for t in textos]
+    # O que o driver devolve para DECIMAL(10,2) e para o CAST em BIGINT
+    linhas_decimal = [Decimal(c).scaleb(-2) for c in centavos]
+    decimais = [Decimal(str(v)) for v in linhas_decimal]
+    dinheiros = [Dinheiro(c) for c in centavos]
+
+    def decimal_formatar():
+        return [
+            f"R$ {v:,.2f}".replace(",", "_").replace(".", ",").replace("_", ".")
+            for v in decimais
+        ]
+
+    def decimal_parse():
+        return [
+            Decimal(t.replace("R$", "").replace(".", "").replace(",", ".").strip())
+            for t in textos
+        ]
+
+    return [
+        ("parse", decimal_parse, lambda: [Dinheiro.de_texto(t) for t in textos]),
+        ("parse (lote)", decimal_parse, lambda: parsear_lote(textos)),
+        ("leitura do banco",
+         lambda: [Decimal(str(v)) for v in linhas_decimal],
+         lambda: [Dinheiro(c) for c in centavos]),
+        ("soma", lambda: sum(decimais), lambda: somar(dinheiros)),
+        ("formatação", decimal_formatar, lambda: [str(v) for v in dinheiros]),
+        ("formatação (lote)", decimal_formatar, lambda: formatar_lote(centavos)),
+    ]
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de Dinheiro x Decimal")
+    parser.add_argument("--valores", type=int, default=100_000)
+    parser.add_argument("--repeticoes", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'etapa':<20}{'Decimal (ms)':>14}{'Dinheiro (ms)':>15}{'ganho':>8}")
+    for nome, decimal, dinheiro in casos(args.valores):
+        t_decimal = min(timeit.repeat(decimal, number=1, repeat=args.repeticoes)) * 1000
+        t_dinheiro = min(timeit.repeat(dinheiro, number=1, repeat=args.repeticoes)) * 1000
+        print(f"{nome:<20}{t_decimal:>14.1f}{t_dinheiro:>15.1f}{t_decimal / t_dinheiro:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""Benchmark de escala do índice de fornecedores.
+
+Gera nomes sintéticos no formato "categoria + dois sobrenomes" (sobrenomes
+sorteados de um conjunto fixo, o que deixa os trigramas bem repetidos) e mede
+a montagem do índice, a busca, o typeahead e a deduplicação em lote para cada
+quantidade de nomes distintos. A coluna "razão" compara o tempo de agrupar
+com o da quantidade anterior: ~3x ao triplicar é linear, ~9x é quadrático.
+
+Uso:
+    python bench_fornecedores.py --nomes 10000 30000 100000
+"""
+import argparse
+import random
+import time
+
+from fornecedores import IndiceFornecedores
+
+CATEGORIAS = ["Buffet", "Doceria", "Floricultura", "Fotografia", "Som e Luz",
+              "Decoração", "Cerimonial", "Salão"]
+SILABAS = ("ba be bi bo bu ca ce ci co da de di do fa fe fi ga go la le li lo lu ma me "
+           "mi mo mu na ne ni no pa pe pi ra re ri ro ru sa se si so ta te ti to va vi").split()
+
+def nomes(quantidade: int, sobrenomes: int = 3000, semente: int = 42):
+    aleatorio = random.Random(semente)
+    conjunto = set()
+    while len(conjunto) < sobrenomes:
+        conjunto.add("".join(aleatorio.choices(SILABAS, k=aleatorio.randint(2, 4))).capitalize())
+    conjunto = sorted(conjunto)
+    contagens = {}
+    while len(contagens) < quantidade:
+        nome = f"{aleatorio.choice(CATEGORIAS)} {aleatorio.choice(conjunto)} {aleatorio.choice(conjunto)}"
+        contagens[nome] = aleatorio.randint(1, 5)
+    return contagens
+
+def _medir(funcao):
+    inicio = time.perf_counter()
+    resultado = funcao()
+    return resultado, time.perf_counter() - inicio
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do índice de fornecedores")
+    parser.add_argument("--nomes", type=int, nargs="+", default=[2500, 10000, 30000])
+    parser.add_argument("--sobrenomes", type=int, default=3000)
+    args = parser.parse_args()
+
+    print(f"{'nomes':>8}{'índice (s)':>12}{'busca (ms)':>12}{'typeahead (ms)':>16}"
+          f"{'agrupar (s)':>13}{'razão':>8}{'grupos':>9}")
+    anterior = None
+    for quantidade in args.nomes:
+        contagens = nomes(quantidade, args.sobrenomes)
+        consultas = list(contagens)[:200]
+        indice, t_indice = _medir(lambda: IndiceFornecedores(contagens))
+        _, t_busca = _medir(lambda: [indice.buscar(c) for c in consultas])
+        _, t_sugerir = _medir(lambda: [indice.sugerir(c[:8]) for c in consultas])
+        grupos, t_agrupar = _medir(indice.agrupar)
+        razao = f"{t_agrupar / anterior:.1f}x" if anterior else "-"
+        anterior = t_agrupar
+        print(f"{quantidade:>8}{t_indice:>12.2f}{t_busca / len(consultas) * 1000:>12.2f}"
+              f"{t_sugerir / len(consultas) * 1000:>16.2f}{t_agrupar:>13.2f}{razao:>8}"
+              f"{len(grupos):>9}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional, Set, Tuple
+
+from barramento import TODAS, Mudanca
+
+# Dependência de uma entrada: (tabela, id). id None = qualquer linha da tabela
+Dependencia = Tuple[str, Optional[int]]
+
+@dataclass
+class MetricasCache:
+    acertos: int = 0
+    faltas: int = 0
+    prefetch_carregados: int = 0
+    prefetch_usados: int = 0
+    prefetch_desperdicados: int = 0  # descartados sem uso (cancelados, invalidados, expulsos)
+    reservas_servidas: int = 0  # dados desatualizados exibidos com o banco fora do ar
+
+    @property
+    def taxa_acerto_prefetch(self) -> float:
+        if not self.prefetch_carregados:
+            return 0.0
+        return self.prefetch_usados / self.prefetch_carregados
+
+def _tamanho(valor) -> int:
+    # Aproximação do custo em memória: número de linhas da consulta. Estruturas
+    # montadas a partir das linhas (o índice de fornecedores) custam uma linha:
+    # contar os nomes do índice faria ele expulsar a si mesmo e o resto do cache
+    if isinstance(valor, (list, tuple, dict, set)):
+        return max(len(valor), 1)
+    return 1
+
+class CacheConsultas:
+    # Cache de consultas de uma sessão, invalidado pelo barramento de mudanças.
+    # Limitado em entradas e em linhas guardadas (LRU).
+    def __init__(self, ao_invalidar: Optional[Callable[[Mudanca], None]] = None,
+                 max_entradas: int = 32, max_linhas: int = 50_000):
+        self._dados: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._dependencias: Dict[Hashable, Set[Dependencia]] = {}
+        self._prefetch: Set[Hashable] = set()  # carregadas por prefetch e ainda não lidas
+        self._cargas: Dict[Hashable, Future] = {}
+        # Último valor de cada chave invalidada, exibido se o banco cair antes
+        # de a chave ser recarregada
+        self._reserva: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._linhas = 0
+        self._lock = threading.Lock()
+        self.versao = 0  # incrementada a cada invalidação
+        self.max_entradas = max_entradas
+        self.max_linhas = max_linhas
+        self.metricas = MetricasCache()
+        self.tabelas_alteradas: Set[str] = set()
+        self.ao_invalidar = ao_invalidar
+
+    def contem(self, chave: Hashable) -> bool:
+        with self._lock:
+            return chave in self._dados or chave in self._cargas
+
+    def obter(self, chave: Hashable, carregar: Callable[[], Any],
+              dependencias: Iterable[Dependencia]):
+        # Prefetch da mesma chave: se já está rodando espera por ele, se ainda
+        # está na fila cancela e carrega aqui mesmo
+        carga = self._cargas.get(chave)
+        if carga is not None and not carga.cancel():
+            try:
+                carga.result()
+            except Exception:
+                pass
+
+        with self._lock:
+            if chave in self._dados:
+                self._dados.move_to_end(chave)
+                self.metricas.acertos += 1
+                if chave in self._prefetch:
+                    self._prefetch.discard(chave)
+                    self.metricas.prefetch_usados += 1
+                return self._dados[chave]
+            self.metricas.faltas += 1
+            versao = self.versao
+
+        valor = carregar()
+        self.guardar(chave, valor, dependencias, versao)
+        return valor
+
+    def guardar(self, chave: Hashable, valor, dependencias: Iterable[Dependencia],
+                versao: int, prefetch: bool = False) -> bool:
+        # As consultas do Database devolvem None em caso de erro; não guardamos
+        # para não prender um erro transitório no cache (resultados vazios são
+        # guardados normalmente). Também descartamos valores lidos antes de uma
+        # invalidação (podem estar desatualizados).
+        with self._lock:
+            if valor is None or versao != self.versao:
+                return False
+            self._remover(chave)
+            self._reserva.pop(chave, None)
+            self._dados[chave] = valor
+            self._dependencias[chave] = set(dependencias)
+            self._linhas += _tamanho(valor)
+            if prefetch:
+                self._prefetch.add(chave)
+                self.metricas.prefetch_carregados += 1
+
+            # A entrada recém-guardada fica mesmo acima do limite de linhas;
+            # expulsá-la faria cada leitura recarregar a consulta
+            while len(self._dados) > 1 and (
+                len(self._dados) > self.max_entradas or self._linhas > self.max_linhas
+            ):
+                self._remover(next(iter(self._dados)))
+            return chave in self._dados
+
+    def registrar_carga(self, chave: Hashable, futuro: Future):
+        with self._lock:
+            self._cargas[chave] = futuro
+
+        def concluida(f):
+            with self._lock:
+                if self._cargas.get(chave) is f:
+                    del self._cargas[chave]
+        futuro.add_done_callback(concluida)
+
+    def _remover(self, chave: Hashable):
+        if chave not in self._dados:
+            return
+        self._linhas -= _tamanho(self._dados.pop(chave))
+        del self._dependencias[chave]
+        if chave in self._prefetch:
+            self._prefetch.discard(chave)
+            self.metricas.prefetch_desperdicados += 1
+
+    def _afetada(self, dependencias: Set[Dependencia], mudanca: Mudanca) -> bool:
+        if mudanca.tabela == TODAS:
+            return True
+        return any(
+            tabela == mudanca.tabela and (id is None or mudanca.id is None or id == mudanca.id)
+            for tabela, id in dependencias
+        )
+
+    def invalidar(self, mudanca: Mudanca):
+        with self._lock:
+            self.versao += 1
+            removidas = [
+                chave for chave, dependencias in self._dependencias.items()
+                if self._afetada(dependencias, mudanca)
+            ]
+            for chave in removidas:
+                self._reserva[chave] = self._dados[chave]
+                self._reserva.move_to_end(chave)
+                self._remover(chave)
+            while len(self._reserva) > self.max_entradas:
+                self._reserva.popitem(last=False)
+            self.tabelas_alteradas.add(mudanca.tabela)
+
+        if self.ao_invalidar:
+            self.ao_invalidar(mudanca)
+
+    def obter_reserva(self, chave: Hashable):
+        # Valor desatualizado da chave (None se não houver)
+        with self._lock:
+            valor = self._reserva.get(chave)
+            if valor is not None:
+                self.metricas.reservas_servidas += 1
+            return valor
+
+    def consumir_alteracao(self, *tabelas: str) -> bool:
+        # Indica (uma vez) se alguma das tabelas mudou desde a última consulta
+        with self._lock:
+            alteradas = self.tabelas_alteradas & (set(tabelas) | {TODAS})
+            self.tabelas_alteradas -= alteradas
+            return bool(alteradas)
+
+    def limpar(self):
+        with self._lock:
+            for chave in list(self._dados):
+                self._remover(chave)
+            self._reserva.clear()
@@ -1,36 +1,39 @@
 from datetime import datetime
-from typing import List, Dict
-from decimal import Decimal
+from typing import List, Dict, Optional
+from dinheiro import Dinheiro
 
 class Demanda:
-    def __init__(self, nome: str, descricao: str, prioridade: int, status: str):
-        self.id = id
+    def __init__(self, nome: str, descricao: str, prioridade: int, status: str,
+                 data_criacao: Optional[datetime] = None):
+        self.id: Optional[int] = None  # Posição em GestorCasamento.demandas
         self.nome = nome
         self.descricao = descricao
         self.prioridade = prioridade  # 1 a 5
         self.status = status  # Pendente, Em Andamento, Concluído
-        self.data_criacao = datetime.now()
+        self.data_criacao = data_criacao or datetime.now()
         self.orcamentos: List[Orcamento] = []
 
 class Orcamento:
-    def __init__(self, fornecedor: str, valor: Decimal, descricao: str):
+    def __init__(self, fornecedor: str, valor: Dinheiro, descricao: str,
+                 data_cotacao: Optional[datetime] = None):
         self.fornecedor = fornecedor
         self.valor = valor
         self.descricao = descricao
-        self.data_cotacao = datetime.now()
+        self.data_cotacao = data_cotacao or datetime.now()
         self.status = "Em análise"  # Em análise, Aprovado, Rejeitado
 
 class ControleFinanceiro:
-    def __init__(self, orcamento_total: Decimal):
+    def __init__(self, orcamento_total: Dinheiro):
         self.orcamento_total = orcamento_total
         self.gastos: List[Dict] = []
         self.saldo = orcamento_total
 
-    def registrar_gasto(self, descricao: str, valor: Decimal):
+    def registrar_gasto(self, descricao: str, valor: Dinheiro,
+                        data: Optional[datetime] = None):
         self.gastos.append({
             "descricao": descricao,
             "valor": valor,
-            "data": datetime.now()
+            "data": data or datetime.now()
         })
         self.saldo -= valor
 
@@ -41,16 +44,17 @@ class GestorCasamento:
 
     def criar_demanda(self, nome: str, descricao: str, prioridade: int) -> Demanda:
         demanda = Demanda(nome, descricao, prioridade, "Pendente")
+        demanda.id = len(self.demandas)
         self.demandas.append(demanda)
         return demanda
 
     def adicionar_orcamento(self, demanda: Demanda, fornecedor: str, 
-                          valor: Decimal, descricao: str) -> Orcamento:
+                          valor: Dinheiro, descricao: str) -> Orcamento:
         orcamento = Orcamento(fornecedor, valor, descricao)
         demanda.orcamentos.append(orcamento)
         return orcamento
 
-    def definir_orcamento_total(self, valor: Decimal):
+    def definir_orcamento_total(self, valor: Dinheiro):
         self.controle_financeiro = ControleFinanceiro(valor)
 
     def listar_demandas_por_status(self, status: str) -> List[Demanda]:
@@ -63,14 +67,14 @@ class GestorCasamento:
         relatorio = f"""
         Relatório Financeiro
         -------------------
-        Orçamento Total: R$ {self.controle_financeiro.orcamento_total}
-        Gastos Totais: R$ {sum(g['valor'] for g in self.controle_financeiro.gastos)}
-        Saldo: R$ {self.controle_financeiro.saldo}
+        Orçamento Total: {self.controle_financeiro.orcamento_total}
+        Gastos Totais: {sum((g['valor'] for g in self.controle_financeiro.gastos), Dinheiro())}
+        Saldo: {self.controle_financeiro.saldo}
         
         Detalhamento de Gastos:
         """
         
         for gasto in self.controle_financeiro.gastos:
-            relatorio += f"\n{gasto['data'].strftime('%d/%m/%Y')} - {gasto['descricao']}: R$ {gasto['valor']}"
+            relatorio += f"\n{gasto['data'].strftime('%d/%m/%Y')} - {gasto['descricao']}: {gasto['valor']}"
         
         return relatorio
\ No newline at end of file
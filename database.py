@@ -1,12 +1,21 @@
 import os
 import pyodbc
+import random
+import sqlite3
 import streamlit as st
 import logging
+import time
+import zlib
+from contextlib import contextmanager
 from dotenv import load_dotenv
 from dataclasses import dataclass
 from datetime import datetime
 from decimal import Decimal
-from typing import List, Optional
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from barramento import TODAS, obter_barramento
+from dinheiro import Dinheiro
+from resiliencia import FECHADO, obter_resiliencia
 
 # Configuração de logging
 logging.basicConfig(
@@ -21,7 +30,7 @@ class Demanda:
     descricao: str
     prioridade: str
     status: str
-    valor: float
+    valor: Dinheiro
     data_criacao: datetime
 
 @dataclass
@@ -29,7 +38,7 @@ class Orcamento:
     id: int
     demanda_id: int
     fornecedor: str
-    valor: Decimal
+    valor: Dinheiro
     descricao: str
     status: str
 
@@ -37,11 +46,73 @@ class Orcamento:
 class Gasto:
     id: int
     descricao: str
-    valor: Decimal
+    valor: Dinheiro
     data: datetime
 
+@dataclass
+class ResumoOrcamentos:
+    demanda_id: int
+    quantidade: int
+    valor_minimo: Dinheiro
+    valor_maximo: Dinheiro
+    valor_total: Dinheiro
+    orcamento_mais_barato_id: int
+
+    @property
+    def valor_medio(self) -> Dinheiro:
+        return self.valor_total / self.quantidade if self.quantidade else Dinheiro()
+
+@dataclass
+class ResultadoLote:
+    demandas: int = 0
+    orcamentos: int = 0
+
+# Operações em lote: ids por instrução (SQL Server aceita até 2100 parâmetros)
+TAMANHO_LOTE = 500
+COLUNAS_FILTRO_DEMANDAS = ("status", "prioridade", "nome")
+
+def _centavos(coluna: str) -> str:
+    # Colunas DECIMAL(_,2) lidas já como centavos inteiros (BIGINT); o ROUND
+    # protege o SQLite, que guarda os valores como REAL
+    return f"CAST(ROUND({coluna} * 100, 0) AS BIGINT)"
+
+# Colunas copiadas pelo backup, na ordem gravada (valor em centavos)
+TABELAS_BACKUP = {
+    "Demandas": ("id", "nome", "descricao", "prioridade", "status", "valor", "data_criacao"),
+    "Orcamentos": ("id", "demanda_id", "fornecedor", "descricao", "valor", "data_criacao"),
+    "Gastos": ("id", "descricao", "valor", "data"),
+}
+
+def _reais_ou_nulo(centavos: Optional[int]) -> Optional[Decimal]:
+    # valor aceita NULL nas tabelas
+    return None if centavos is None else Dinheiro(centavos).em_reais()
+
+_COLUNAS_RESUMO = (
+    f"demanda_id, quantidade, {_centavos('valor_minimo')}, {_centavos('valor_maximo')}, "
+    f"{_centavos('valor_total')}, orcamento_mais_barato_id"
+)
+
+# Resumo recalculado do zero; usado na reconstrução e na verificação.
+# Empates no menor valor ficam com o orçamento mais antigo (menor id).
+_SQL_RESUMO_CALCULADO = """
+    SELECT r.demanda_id, r.quantidade, r.valor_minimo, r.valor_maximo, r.valor_total,
+           (SELECT MIN(o.id) FROM Orcamentos o
+            WHERE o.demanda_id = r.demanda_id AND o.valor = r.valor_minimo)
+           AS orcamento_mais_barato_id
+    FROM (
+        SELECT demanda_id, COUNT(*) AS quantidade, MIN(valor) AS valor_minimo,
+               MAX(valor) AS valor_maximo, SUM(valor) AS valor_total
+        FROM Orcamentos
+        WHERE demanda_id IS NOT NULL AND valor IS NOT NULL
+        GROUP BY demanda_id
+    ) r
+"""
+
 class Database:
     def __init__(self):
+        # Escritas publicam (tabela, id, operação) para caches e sessões
+        self.barramento = obter_barramento()
+
         try:
             # Configurações de conexão
             self.connection_string = (
@@ -52,25 +123,53 @@ class Database:
                 "Pwd=Senha@007;"
                 "Encrypt=yes;"
                 "TrustServerCertificate=no;"
-                "Connection Timeout=30;"
+            )
+            # Disjuntor e métricas compartilhados por todas as sessões do processo
+            self.resiliencia = obter_resiliencia(self._chave_resiliencia())
+            self.connection_string += (
+                f"Connection Timeout={self.resiliencia.politica.timeout_conexao};"
             )
             
             # Verifica se as tabelas existem
             if not self.tabelas_existem():
                 self.criar_tabelas()
+
+            # Tabela de resumo dos orçamentos (mantida a cada escrita)
+            if not self.tabela_resumo_existe():
+                self.criar_tabela_resumo()
                 
         except Exception as e:
             st.error("❌ Erro na conexão com banco de dados")
             st.error(f"Detalhes: {str(e)}")
             raise e
             
+    def _chave_resiliencia(self) -> str:
+        return self.connection_string
+
+    def _conectar(self):
+        politica = self.resiliencia.politica
+        conn = pyodbc.connect(self.connection_string, timeout=politica.timeout_conexao)
+        conn.timeout = politica.timeout_consulta
+        return conn
+
     def get_connection(self):
+        # Com o disjuntor aberto levanta BancoIndisponivel na hora, sem esperar
+        # o timeout; os métodos tratam como qualquer outro erro de conexão
         try:
-            return pyodbc.connect(self.connection_string)
+            return self.resiliencia.conectar(self._conectar)
         except pyodbc.Error as e:
             st.error(f"Erro de conexão: {str(e)}")
             raise e
 
+    def _ler(self, ler):
+        # Consultas só de leitura: com erro transitório (na conexão ou no meio
+        # da instrução) ler(conn) é repetida com espera, até o limite da política
+        return self.resiliencia.executar_leitura(self._conectar, ler)
+
+    @property
+    def disponivel(self) -> bool:
+        return self.resiliencia.estado == FECHADO
+
     def tabelas_existem(self):
         try:
             with self.get_connection() as conn:
@@ -121,54 +220,107 @@ class Database:
             st.error(f"Detalhes: {str(e)}")
             raise e
 
-    def inserir_demanda(self, nome, descricao, prioridade, valor=0.0):
+    def tabela_resumo_existe(self):
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    SELECT COUNT(*) 
+                    FROM INFORMATION_SCHEMA.TABLES 
+                    WHERE TABLE_NAME = 'ResumoOrcamentos'
+                """)
+                return cursor.fetchone()[0] == 1
+
+        except Exception as e:
+            st.error(f"Erro ao verificar tabela de resumo: {str(e)}")
+            return False
+
+    def criar_tabela_resumo(self):
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+
+                # Uma linha por demanda com orçamentos. Não usamos view indexada
+                # porque o SQL Server não permite MIN/MAX nelas.
+                cursor.execute("""
+                IF NOT EXISTS (SELECT * FROM sys.objects WHERE object_id = OBJECT_ID(N'[dbo].[ResumoOrcamentos]') AND type in (N'U'))
+                BEGIN
+                    CREATE TABLE ResumoOrcamentos (
+                        demanda_id INT PRIMARY KEY,
+                        quantidade INT NOT NULL,
+                        valor_minimo DECIMAL(10,2) NOT NULL,
+                        valor_maximo DECIMAL(10,2) NOT NULL,
+                        valor_total DECIMAL(14,2) NOT NULL,
+                        orcamento_mais_barato_id INT NOT NULL
+                    )
+                END
+
+                IF NOT EXISTS (SELECT * FROM sys.indexes WHERE name = 'IX_Orcamentos_demanda_id')
+                BEGIN
+                    CREATE INDEX IX_Orcamentos_demanda_id ON Orcamentos (demanda_id, valor)
+                END
+                """)
+
+                conn.commit()
+
+            # Preenche a partir dos orçamentos já existentes
+            self.reconstruir_resumos()
+
+        except Exception as e:
+            st.error("❌ Erro ao criar tabela de resumo")
+            st.error(f"Detalhes: {str(e)}")
+            raise e
+
+    def inserir_demanda(self, nome, descricao, prioridade, valor: Dinheiro = Dinheiro()):
         try:
-            # Garante que valor é float
-            valor = float(valor)
-            
             with self.get_connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute("""
                     INSERT INTO Demandas 
                     (nome, descricao, prioridade, status, valor)
                     VALUES (?, ?, ?, 'Pendente', ?)
-                """, (nome, descricao, prioridade, valor))
+                """, (nome, descricao, prioridade, valor.em_reais()))
+                demanda_id = self._ultimo_id(cursor)
                 conn.commit()
-                return True
+            self.barramento.publicar("Demandas", demanda_id, "inserir")
+            return True
                 
         except Exception as e:
             st.error(f"Erro ao inserir demanda: {str(e)}")
             return False
 
-    def obter_demandas(self):
+    def obter_demandas(self) -> Optional[List[Demanda]]:
+        def ler(conn):
+            cursor = conn.cursor()
+            cursor.execute(f"""
+                SELECT id, nome, descricao, prioridade, status, {_centavos('valor')},
+                       data_criacao
+                FROM Demandas
+                ORDER BY data_criacao DESC
+            """)
+
+            demandas = []
+            for row in cursor.fetchall():
+                demandas.append(Demanda(
+                    id=row[0],
+                    nome=row[1],
+                    descricao=row[2],
+                    prioridade=row[3],
+                    status=row[4],
+                    valor=Dinheiro(row[5]),
+                    data_criacao=row[6]
+                ))
+            return demandas
+
         try:
-            with self.get_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute("""
-                    SELECT id, nome, descricao, prioridade, status, valor, data_criacao
-                    FROM Demandas
-                    ORDER BY data_criacao DESC
-                """)
-                
-                demandas = []
-                for row in cursor.fetchall():
-                    demandas.append(Demanda(
-                        id=row[0],
-                        nome=row[1],
-                        descricao=row[2],
-                        prioridade=row[3],
-                        status=row[4],
-                        valor=float(row[5]),
-                        data_criacao=row[6]
-                    ))
-                return demandas
-                
+            return self._ler(ler)
         except Exception as e:
             st.error(f"Erro ao obter demandas: {str(e)}")
-            return []
+            return None  # distinto de vazio: falha não vai para o cache
 
-    def inserir_orcamento(self, demanda_id, fornecedor, descricao, valor):
+    def inserir_orcamento(self, demanda_id, fornecedor, descricao, valor: Dinheiro):
         try:
+            valor = valor.em_reais()
             with self.get_connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute("""
@@ -176,42 +328,55 @@ class Database:
                     (demanda_id, fornecedor, descricao, valor)
                     VALUES (?, ?, ?, ?)
                 """, (demanda_id, fornecedor, descricao, valor))
+                # Mesma transação: o resumo nunca fica fora de sincronia
+                orcamento_id = self._ultimo_id(cursor)
+                self._registrar_no_resumo(cursor, demanda_id, orcamento_id, valor)
                 conn.commit()
-                return True
+            self.barramento.publicar("Orcamentos", orcamento_id, "inserir")
+            self.barramento.publicar("ResumoOrcamentos", demanda_id, "atualizar")
+            return True
                 
         except Exception as e:
             st.error(f"Erro ao inserir orçamento: {str(e)}")
             return False
 
-    def inserir_gasto(self, descricao: str, valor: float) -> bool:
+    def inserir_gasto(self, descricao: str, valor: Dinheiro) -> bool:
         try:
             with self.get_connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute("""
                     INSERT INTO Gastos (descricao, valor)
                     VALUES (?, ?)
-                """, (descricao, valor))
+                """, (descricao, valor.em_reais()))
+                gasto_id = self._ultimo_id(cursor)
                 conn.commit()
-                return True
+            self.barramento.publicar("Gastos", gasto_id, "inserir")
+            return True
         except Exception as e:
             logging.error(f"Erro ao inserir gasto: {e}")
             return False
 
-    def obter_gastos(self):
+    def obter_gastos(self) -> Optional[List[Gasto]]:
+        def ler(conn):
+            cursor = conn.cursor()
+            cursor.execute(f"""
+                SELECT id, descricao, {_centavos('valor')}, data
+                FROM Gastos
+                ORDER BY data DESC
+            """)
+            rows = cursor.fetchall()
+            return [Gasto(
+                id=row[0],
+                descricao=row[1],
+                valor=Dinheiro(row[2]),
+                data=row[3]
+            ) for row in rows]
+
         try:
-            with self.get_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute("SELECT * FROM Gastos ORDER BY data DESC")
-                rows = cursor.fetchall()
-                return [Gasto(
-                    id=row[0],
-                    descricao=row[1],
-                    valor=row[2],
-                    data=row[3]
-                ) for row in rows]
+            return self._ler(ler)
         except Exception as e:
             logging.error(f"Erro ao obter gastos: {e}")
-            return []
+            return None
 
     def atualizar_demanda(self, id: int, nome: str, descricao: str, 
                          prioridade: int, status: str) -> bool:
@@ -224,65 +389,637 @@ class Database:
                     WHERE id=?
                 """, (nome, descricao, prioridade, status, id))
                 conn.commit()
-                return cursor.rowcount > 0
+                atualizada = cursor.rowcount > 0
+            if atualizada:
+                self.barramento.publicar("Demandas", id, "atualizar")
+            return atualizada
         except Exception as e:
             logging.error(f"Erro ao atualizar demanda: {e}")
             return False
 
     def deletar_demanda(self, id: int) -> bool:
+        return self.deletar_demandas(ids=[id]) is not None
+
+    def excluir_demanda(self, demanda_id):
         try:
             with self.get_connection() as conn:
-                cursor = conn.cursor()
-                # Primeiro deleta os orçamentos relacionados
-                cursor.execute("DELETE FROM Orcamentos WHERE demanda_id=?", (id,))
-                # Depois deleta a demanda
-                cursor.execute("DELETE FROM Demandas WHERE id=?", (id,))
+                # Mesmo caminho do lote: remove também os orçamentos (FK)
+                self._deletar_em_lote(conn.cursor(), self._clausulas_where([demanda_id], None))
                 conn.commit()
-                return True
+            self._publicar_demandas([demanda_id], None, "deletar")
+            return True
         except Exception as e:
-            logging.error(f"Erro ao deletar demanda: {e}")
+            st.error(f"Erro ao excluir demanda: {str(e)}")
             return False
 
-    def excluir_demanda(self, demanda_id):
+    def _publicar_demandas(self, ids, filtro, operacao):
+        # Com filtro não sabemos quais linhas casaram: publica a tabela toda
+        if ids is None or filtro:
+            ids = [None]
+        for id in dict.fromkeys(ids):
+            self.barramento.publicar("Demandas", id, operacao)
+            if operacao == "deletar":
+                self.barramento.publicar("ResumoOrcamentos", id, operacao)
+        if operacao == "deletar":
+            self.barramento.publicar("Orcamentos", None, operacao)
+
+    def _clausulas_where(self, ids: Optional[Iterable[int]],
+                         filtro: Optional[Dict]) -> List[Tuple[str, list]]:
+        # Monta as cláusulas WHERE sobre Demandas; listas de ids grandes são
+        # quebradas em lotes para respeitar o limite de parâmetros do SQL Server
+        if ids is None and not filtro:
+            raise ValueError("Informe ids ou um filtro para a operação em lote")
+
+        condicoes, params = [], []
+        for coluna, valor in (filtro or {}).items():
+            if coluna not in COLUNAS_FILTRO_DEMANDAS:
+                raise ValueError(f"Coluna de filtro inválida: {coluna}")
+            if isinstance(valor, (list, tuple, set)):
+                valor = list(valor)
+                if not valor:
+                    # "IN ()" é erro de sintaxe no SQL Server; nenhuma linha casa
+                    return []
+                condicoes.append(f"{coluna} IN ({', '.join('?' * len(valor))})")
+                params.extend(valor)
+            else:
+                condicoes.append(f"{coluna} = ?")
+                params.append(valor)
+
+        if ids is None:
+            return [(" AND ".join(condicoes), params)]
+
+        ids = list(dict.fromkeys(ids))
+        clausulas = []
+        for inicio in range(0, len(ids), TAMANHO_LOTE):
+            lote = ids[inicio:inicio + TAMANHO_LOTE]
+            clausula = f"id IN ({', '.join('?' * len(lote))})"
+            clausulas.append((
+                " AND ".join([clausula] + condicoes),
+                lote + params
+            ))
+        return clausulas
+
+    def _deletar_em_lote(self, cursor, clausulas) -> ResultadoLote:
+        resultado = ResultadoLote()
+        for where, params in clausulas:
+            subconsulta = f"SELECT id FROM Demandas WHERE {where}"
+            cursor.execute(
+                f"DELETE FROM Orcamentos WHERE demanda_id IN ({subconsulta})", params
+            )
+            resultado.orcamentos += max(cursor.rowcount, 0)
+            cursor.execute(
+                f"DELETE FROM ResumoOrcamentos WHERE demanda_id IN ({subconsulta})", params
+            )
+            cursor.execute(f"DELETE FROM Demandas WHERE {where}", params)
+            resultado.demandas += max(cursor.rowcount, 0)
+        return resultado
+
+    def deletar_demandas(self, ids: Optional[Iterable[int]] = None,
+                         filtro: Optional[Dict] = None) -> Optional[ResultadoLote]:
         try:
+            ids = list(ids) if ids is not None else None
+            clausulas = self._clausulas_where(ids, filtro)
+            with self.get_connection() as conn:
+                # Todos os lotes na mesma transação
+                resultado = self._deletar_em_lote(conn.cursor(), clausulas)
+                conn.commit()
+            if resultado.demandas:
+                self._publicar_demandas(ids, filtro, "deletar")
+            return resultado
+        except Exception as e:
+            logging.error(f"Erro ao deletar demandas em lote: {e}")
+            return None
+
+    def atualizar_demandas(self, ids: Optional[Iterable[int]] = None,
+                           filtro: Optional[Dict] = None,
+                           status: Optional[str] = None,
+                           prioridade: Optional[str] = None) -> Optional[int]:
+        try:
+            campos = {"status": status, "prioridade": prioridade}
+            campos = {coluna: valor for coluna, valor in campos.items() if valor is not None}
+            if not campos:
+                raise ValueError("Informe status e/ou prioridade")
+
+            set_sql = ", ".join(f"{coluna}=?" for coluna in campos)
+            ids = list(ids) if ids is not None else None
+            clausulas = self._clausulas_where(ids, filtro)
             with self.get_connection() as conn:
                 cursor = conn.cursor()
-                cursor.execute("DELETE FROM Demandas WHERE id = ?", (demanda_id,))
+                total = 0
+                for where, params in clausulas:
+                    cursor.execute(
+                        f"UPDATE Demandas SET {set_sql} WHERE {where}",
+                        list(campos.values()) + params
+                    )
+                    total += max(cursor.rowcount, 0)
                 conn.commit()
-                return True
+            if total:
+                self._publicar_demandas(ids, filtro, "atualizar")
+            return total
         except Exception as e:
-            st.error(f"Erro ao excluir demanda: {str(e)}")
-            return False
+            logging.error(f"Erro ao atualizar demandas em lote: {e}")
+            return None
 
     def obter_orcamentos_por_demanda(self, demanda_id: int) -> List[Orcamento]:
+        def ler(conn):
+            cursor = conn.cursor()
+            cursor.execute(f"""
+                SELECT id, demanda_id, fornecedor, {_centavos('valor')}, descricao
+                FROM Orcamentos
+                WHERE demanda_id=?
+                ORDER BY valor ASC
+            """, (demanda_id,))
+            rows = cursor.fetchall()
+            # A tabela não tem status; todo orçamento começa em análise
+            return [Orcamento(
+                id=row[0],
+                demanda_id=row[1],
+                fornecedor=row[2],
+                valor=Dinheiro(row[3]),
+                descricao=row[4],
+                status="Em análise"
+            ) for row in rows]
+
         try:
+            return self._ler(ler)
+        except Exception as e:
+            logging.error(f"Erro ao obter orçamentos: {e}")
+            return []
+
+    def obter_total_gastos(self) -> Dinheiro:
+        def ler(conn):
+            cursor = conn.cursor()
+            cursor.execute(f"SELECT {_centavos('SUM(valor)')} FROM Gastos")
+            result = cursor.fetchone()[0]
+            return Dinheiro(result) if result else Dinheiro()
+
+        try:
+            return self._ler(ler)
+        except Exception as e:
+            logging.error(f"Erro ao calcular total de gastos: {e}")
+            return Dinheiro()
+
+    def obter_fornecedores(self) -> Optional[Dict[str, int]]:
+        # Grafias distintas de fornecedor e quantos orçamentos usam cada uma
+        def ler(conn):
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT fornecedor, COUNT(*)
+                FROM Orcamentos
+                GROUP BY fornecedor
+            """)
+            return {row[0]: row[1] for row in cursor.fetchall()}
+
+        try:
+            return self._ler(ler)
+        except Exception as e:
+            logging.error(f"Erro ao obter fornecedores: {e}")
+            return None
+
+    def unificar_fornecedores(self, renomear: Dict[str, str]) -> Optional[int]:
+        # renomear: grafia atual -> nome canônico. Tudo numa transação, com
+        # um UPDATE por nome canônico e lotes de até TAMANHO_LOTE grafias.
+        por_canonico: Dict[str, List[str]] = {}
+        for atual, canonico in renomear.items():
+            if atual != canonico:
+                por_canonico.setdefault(canonico, []).append(atual)
+        if not por_canonico:
+            return 0
+
+        try:
+            total = 0
             with self.get_connection() as conn:
                 cursor = conn.cursor()
-                cursor.execute("""
-                    SELECT * FROM Orcamentos 
-                    WHERE demanda_id=? 
-                    ORDER BY valor ASC
-                """, (demanda_id,))
-                rows = cursor.fetchall()
-                return [Orcamento(
-                    id=row[0],
-                    demanda_id=row[1],
-                    fornecedor=row[2],
-                    valor=Decimal(str(row[3])),
-                    descricao=row[4],
-                    status=row[5]
-                ) for row in rows]
+                for canonico, atuais in por_canonico.items():
+                    for inicio in range(0, len(atuais), TAMANHO_LOTE):
+                        lote = atuais[inicio:inicio + TAMANHO_LOTE]
+                        marcadores = ", ".join("?" * len(lote))
+                        cursor.execute(
+                            f"UPDATE Orcamentos SET fornecedor = ? WHERE fornecedor IN ({marcadores})",
+                            [canonico, *lote]
+                        )
+                        total += cursor.rowcount
+                conn.commit()
+            if total:
+                self.barramento.publicar("Orcamentos", None, "atualizar")
+            return total
         except Exception as e:
-            logging.error(f"Erro ao obter orçamentos: {e}")
+            logging.error(f"Erro ao unificar fornecedores: {e}")
+            return None
+
+    def _ultimo_id(self, cursor) -> Optional[int]:
+        # @@IDENTITY vale para a sessão; SCOPE_IDENTITY() seria NULL aqui porque
+        # o pyodbc executa cada instrução em um lote separado
+        cursor.execute("SELECT CAST(@@IDENTITY AS INT)")
+        return cursor.fetchone()[0]
+
+    # UPDLOCK + SERIALIZABLE: a trava de faixa na chave vale até o commit, então
+    # dois primeiros orçamentos simultâneos da mesma demanda não fazem os dois
+    # o INSERT (violação de PK); o segundo espera e cai no UPDATE
+    _TRAVA_RESUMO = "WITH (UPDLOCK, SERIALIZABLE)"
+
+    def _registrar_no_resumo(self, cursor, demanda_id, orcamento_id, valor):
+        # Atualização incremental O(1) a partir do id recém-inserido
+        cursor.execute(f"""
+            UPDATE ResumoOrcamentos {self._TRAVA_RESUMO}
+            SET quantidade = quantidade + 1,
+                valor_total = valor_total + ?,
+                orcamento_mais_barato_id = CASE WHEN ? < valor_minimo
+                    THEN ? ELSE orcamento_mais_barato_id END,
+                valor_minimo = CASE WHEN ? < valor_minimo THEN ? ELSE valor_minimo END,
+                valor_maximo = CASE WHEN ? > valor_maximo THEN ? ELSE valor_maximo END
+            WHERE demanda_id = ?
+        """, (valor, valor, orcamento_id, valor, valor, valor, valor, demanda_id))
+
+        if cursor.rowcount == 0:
+            cursor.execute("""
+                INSERT INTO ResumoOrcamentos
+                (demanda_id, quantidade, valor_minimo, valor_maximo, valor_total,
+                 orcamento_mais_barato_id)
+                VALUES (?, 1, ?, ?, ?, ?)
+            """, (demanda_id, valor, valor, valor, orcamento_id))
+
+    def _resumo_da_linha(self, row) -> ResumoOrcamentos:
+        return ResumoOrcamentos(
+            demanda_id=row[0],
+            quantidade=row[1],
+            valor_minimo=Dinheiro(row[2]),
+            valor_maximo=Dinheiro(row[3]),
+            valor_total=Dinheiro(row[4]),
+            orcamento_mais_barato_id=row[5]
+        )
+
+    def obter_resumo_orcamentos(self, demanda_id: int) -> Optional[ResumoOrcamentos]:
+        def ler(conn):
+            cursor = conn.cursor()
+            cursor.execute(f"""
+                SELECT {_COLUNAS_RESUMO}
+                FROM ResumoOrcamentos
+                WHERE demanda_id=?
+            """, (demanda_id,))
+            row = cursor.fetchone()
+            return self._resumo_da_linha(row) if row else None
+
+        try:
+            return self._ler(ler)
+        except Exception as e:
+            logging.error(f"Erro ao obter resumo de orçamentos: {e}")
+            return None
+
+    def obter_resumos_orcamentos(self) -> Optional[Dict[int, ResumoOrcamentos]]:
+        def ler(conn):
+            cursor = conn.cursor()
+            cursor.execute(f"""
+                SELECT {_COLUNAS_RESUMO}
+                FROM ResumoOrcamentos
+            """)
+            return {
+                row[0]: self._resumo_da_linha(row)
+                for row in cursor.fetchall()
+            }
+
+        try:
+            return self._ler(ler)
+        except Exception as e:
+            logging.error(f"Erro ao obter resumos de orçamentos: {e}")
+            return None
+
+    def verificar_resumos(self, reconstruir: bool = True) -> List[int]:
+        # Compara o resumo mantido com os orçamentos reais; retorna as
+        # demandas divergentes e, se pedido, reconstrói tudo em lote
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(f"SELECT {_COLUNAS_RESUMO} FROM ({_SQL_RESUMO_CALCULADO}) r")
+                esperado = {
+                    row[0]: self._resumo_da_linha(row)
+                    for row in cursor.fetchall()
+                }
+        except Exception as e:
+            logging.error(f"Erro ao verificar resumos: {e}")
+            return []
+
+        atual = self.obter_resumos_orcamentos()
+        if atual is None:
             return []
+        divergentes = sorted(
+            demanda_id
+            for demanda_id in esperado.keys() | atual.keys()
+            if esperado.get(demanda_id) != atual.get(demanda_id)
+        )
+
+        if divergentes:
+            logging.warning(f"Resumos divergentes para demandas: {divergentes}")
+            if reconstruir:
+                self.reconstruir_resumos()
+        return divergentes
 
-    def obter_total_gastos(self) -> Decimal:
+    def reconstruir_resumos(self) -> int:
         try:
             with self.get_connection() as conn:
                 cursor = conn.cursor()
-                cursor.execute("SELECT SUM(valor) FROM Gastos")
-                result = cursor.fetchone()[0]
-                return Decimal(str(result)) if result else Decimal('0')
+                cursor.execute("DELETE FROM ResumoOrcamentos")
+                cursor.execute(f"""
+                    INSERT INTO ResumoOrcamentos
+                    (demanda_id, quantidade, valor_minimo, valor_maximo, valor_total,
+                     orcamento_mais_barato_id)
+                    {_SQL_RESUMO_CALCULADO}
+                """)
+                total = cursor.rowcount
+                conn.commit()
+            self.barramento.publicar("ResumoOrcamentos", None, "reconstruir")
+            return total
         except Exception as e:
-            logging.error(f"Erro ao calcular total de gastos: {e}")
-            return Decimal('0')
\ No newline at end of file
+            logging.error(f"Erro ao reconstruir resumos: {e}")
+            return 0
+
+    # Backup: sem try/except de propósito; um erro aqui não pode virar um
+    # resultado vazio (que o backup leria como "tabela apagada")
+    @contextmanager
+    def leitura_consistente(self):
+        # Uma conexão e uma transação só de leitura: todas as consultas feitas
+        # com o cursor devolvido veem o mesmo instante do banco
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            self._iniciar_leitura_consistente(cursor)
+            try:
+                yield cursor
+            finally:
+                conn.rollback()
+                self._encerrar_leitura_consistente(cursor)
+
+    def _iniciar_leitura_consistente(self, cursor):
+        # SNAPSHOT lê versões das linhas sem travar as escritas; o instante é
+        # o da primeira leitura da transação (implícita: autocommit desligado).
+        # Requer ALLOW_SNAPSHOT_ISOLATION, ligado por padrão no Azure SQL.
+        cursor.execute("SET TRANSACTION ISOLATION LEVEL SNAPSHOT")
+
+    def _encerrar_leitura_consistente(self, cursor):
+        # O nível de isolamento é da sessão e sobrevive ao pool de conexões
+        cursor.execute("SET TRANSACTION ISOLATION LEVEL READ COMMITTED")
+
+    def somas_por_bloco(self, cursor, tabela: str, tamanho: int) -> Dict[int, Tuple[int, int]]:
+        # bloco (faixa de ids) -> (linhas, checksum), calculados no servidor
+        colunas = ", ".join(TABELAS_BACKUP[tabela])
+        cursor.execute(f"""
+            SELECT id / {int(tamanho)}, COUNT(*),
+                   CHECKSUM_AGG(BINARY_CHECKSUM({colunas}))
+            FROM {tabela}
+            GROUP BY id / {int(tamanho)}
+        """)
+        return {row[0]: (row[1], row[2]) for row in cursor.fetchall()}
+
+    def linhas_do_bloco(self, cursor, tabela: str, inicio: int, fim: int) -> List[tuple]:
+        colunas = ", ".join(
+            _centavos(c) if c == "valor" else c for c in TABELAS_BACKUP[tabela]
+        )
+        cursor.execute(f"""
+            SELECT {colunas}
+            FROM {tabela}
+            WHERE id >= ? AND id < ?
+            ORDER BY id
+        """, (inicio, fim))
+        return [tuple(row) for row in cursor.fetchall()]
+
+    def restaurar_tabelas(self, linhas_por_tabela: Dict[str, List[tuple]]) -> int:
+        # Substitui todo o conteúdo numa transação, mantendo os ids originais
+        total = 0
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            for tabela in ("Orcamentos", "ResumoOrcamentos", "Demandas", "Gastos"):
+                cursor.execute(f"DELETE FROM {tabela}")
+            for tabela, colunas in TABELAS_BACKUP.items():
+                posicao_valor = colunas.index("valor")
+                linhas = [
+                    row[:posicao_valor]
+                    + (_reais_ou_nulo(row[posicao_valor]),)
+                    + row[posicao_valor + 1:]
+                    for row in linhas_por_tabela.get(tabela, ())
+                ]
+                if linhas:
+                    self._inserir_com_id(cursor, tabela, colunas, linhas)
+                total += len(linhas)
+            conn.commit()
+        self.reconstruir_resumos()
+        self.barramento.publicar(TODAS, None, "reconstruir")
+        return total
+
+    def _inserir_com_id(self, cursor, tabela: str, colunas, linhas: List[tuple]):
+        cursor.fast_executemany = True
+        cursor.execute(f"SET IDENTITY_INSERT {tabela} ON")
+        cursor.executemany(
+            f"INSERT INTO {tabela} ({', '.join(colunas)}) "
+            f"VALUES ({', '.join('?' * len(colunas))})",
+            linhas
+        )
+        cursor.execute(f"SET IDENTITY_INSERT {tabela} OFF")
+
+
+# Substituto local do SQL Server em SQLite (desenvolvimento e testes de carga)
+_DDL_SQLITE = """
+CREATE TABLE IF NOT EXISTS Demandas (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    nome NVARCHAR(100),
+    descricao NVARCHAR(500),
+    prioridade NVARCHAR(10),
+    status NVARCHAR(20),
+    valor DECIMAL(10,2),
+    data_criacao TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE IF NOT EXISTS Orcamentos (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    demanda_id INT REFERENCES Demandas(id),
+    fornecedor NVARCHAR(100),
+    descricao NVARCHAR(200),
+    valor DECIMAL(10,2),
+    data_criacao TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE IF NOT EXISTS Gastos (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    descricao NVARCHAR(200),
+    valor DECIMAL(10,2),
+    data TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+"""
+
+_DDL_SQLITE_RESUMO = """
+CREATE TABLE IF NOT EXISTS ResumoOrcamentos (
+    demanda_id INT PRIMARY KEY,
+    quantidade INT NOT NULL,
+    valor_minimo DECIMAL(10,2) NOT NULL,
+    valor_maximo DECIMAL(10,2) NOT NULL,
+    valor_total DECIMAL(14,2) NOT NULL,
+    orcamento_mais_barato_id INT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS IX_Orcamentos_demanda_id ON Orcamentos (demanda_id, valor);
+"""
+
+# Parâmetros DECIMAL (Dinheiro.em_reais) viram texto; a afinidade NUMERIC da
+# coluna converte para número
+sqlite3.register_adapter(Decimal, str)
+
+def _binary_checksum(*valores) -> int:
+    # Equivalentes locais de BINARY_CHECKSUM/CHECKSUM_AGG (int32 com sinal),
+    # para as somas por bloco do backup usarem o mesmo SQL
+    soma = zlib.crc32(repr(valores).encode())
+    return soma - (1 << 32) if soma >= 1 << 31 else soma
+
+class _ChecksumAgg:
+    def __init__(self):
+        self.soma = 0
+
+    def step(self, valor):
+        if valor is not None:
+            self.soma ^= valor
+
+    def finalize(self):
+        return self.soma
+
+class DatabaseLocal(Database):
+    def __init__(self, caminho: str = "cazar_local.db"):
+        self.caminho = caminho
+        super().__init__()
+
+    def _chave_resiliencia(self) -> str:
+        return os.path.abspath(self.caminho)
+
+    def _conectar(self):
+        # timeout do SQLite: espera por um arquivo bloqueado por outra escrita
+        conn = sqlite3.connect(
+            self.caminho,
+            timeout=self.resiliencia.politica.timeout_consulta,
+            detect_types=sqlite3.PARSE_DECLTYPES
+        )
+        conn.execute("PRAGMA foreign_keys = ON")
+        conn.create_function("BINARY_CHECKSUM", -1, _binary_checksum, deterministic=True)
+        conn.create_aggregate("CHECKSUM_AGG", 1, _ChecksumAgg)
+        return conn
+
+    # SQLite serializa as escritas no arquivo todo; não há dicas de trava
+    _TRAVA_RESUMO = ""
+
+    def _ultimo_id(self, cursor) -> Optional[int]:
+        return cursor.lastrowid
+
+    def _iniciar_leitura_consistente(self, cursor):
+        # Em WAL a transação de leitura vê o instante da primeira consulta e
+        # não bloqueia as escritas das outras conexões
+        cursor.execute("BEGIN")
+
+    def _encerrar_leitura_consistente(self, cursor):
+        pass
+
+    def _inserir_com_id(self, cursor, tabela: str, colunas, linhas: List[tuple]):
+        # SQLite aceita o id explícito direto
+        cursor.executemany(
+            f"INSERT INTO {tabela} ({', '.join(colunas)}) "
+            f"VALUES ({', '.join('?' * len(colunas))})",
+            linhas
+        )
+
+    def _tabelas_sqlite(self, nomes) -> int:
+        with self.get_connection() as conn:
+            cursor = conn.execute(
+                f"""SELECT COUNT(*) FROM sqlite_master
+                    WHERE type = 'table' AND name IN ({', '.join('?' * len(nomes))})""",
+                nomes
+            )
+            return cursor.fetchone()[0]
+
+    def tabelas_existem(self):
+        return self._tabelas_sqlite(("Demandas", "Orcamentos", "Gastos")) == 3
+
+    def criar_tabelas(self):
+        with self.get_connection() as conn:
+            # WAL permite leituras concorrentes enquanto outra sessão escreve
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.executescript(_DDL_SQLITE)
+
+    def tabela_resumo_existe(self):
+        return self._tabelas_sqlite(("ResumoOrcamentos",)) == 1
+
+    def criar_tabela_resumo(self):
+        with self.get_connection() as conn:
+            conn.executescript(_DDL_SQLITE_RESUMO)
+        self.reconstruir_resumos()
+
+class DatabaseComFalhas(DatabaseLocal):
+    # Substituto local que simula um Azure degradado: latência e falhas
+    # transitórias ao conectar e nas consultas, com os mesmos erros do pyodbc.
+    # As falhas só começam depois da criação das tabelas.
+    def __init__(self, caminho: str = "cazar_local.db", taxa_falhas: float = 0.0,
+                 latencia: float = 0.0, fora_do_ar: bool = False,
+                 semente: Optional[int] = None):
+        self.taxa_falhas = 0.0
+        self.latencia = 0.0
+        self.fora_do_ar = False
+        self._aleatorio = random.Random(semente)
+        super().__init__(caminho)
+        self.taxa_falhas = taxa_falhas
+        self.latencia = latencia
+        self.fora_do_ar = fora_do_ar
+
+    def _falhar(self, sqlstate: str, mensagem: str):
+        if self.latencia:
+            time.sleep(self.latencia)
+        if self.fora_do_ar or self._aleatorio.random() < self.taxa_falhas:
+            raise pyodbc.OperationalError(sqlstate, f"[{sqlstate}] {mensagem} (falha injetada)")
+
+    def _conectar(self):
+        self._falhar("08001", "Não foi possível abrir a conexão com o servidor")
+        return _ConexaoInstavel(super()._conectar(), self._falhar)
+
+class _ConexaoInstavel:
+    # Conexão SQLite cujas instruções também podem falhar (link caído no meio
+    # da transação); o with da conexão desfaz o que já tinha sido feito
+    def __init__(self, conn, falhar):
+        self._conn = conn
+        self._falhar = falhar
+
+    def __getattr__(self, nome):
+        return getattr(self._conn, nome)
+
+    def __enter__(self):
+        self._conn.__enter__()
+        return self
+
+    def __exit__(self, *exc):
+        return self._conn.__exit__(*exc)
+
+    def cursor(self):
+        return _CursorInstavel(self._conn.cursor(), self._falhar)
+
+    def execute(self, *args):
+        return self.cursor().execute(*args)
+
+class _CursorInstavel:
+    def __init__(self, cursor, falhar):
+        self._cursor = cursor
+        self._falhar = falhar
+
+    def __getattr__(self, nome):
+        return getattr(self._cursor, nome)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def execute(self, *args):
+        self._falhar("08S01", "Falha no link de comunicação")
+        self._cursor.execute(*args)
+        return self
+
+    def executemany(self, *args):
+        self._falhar("08S01", "Falha no link de comunicação")
+        self._cursor.executemany(*args)
+        return self
+
+def criar_database() -> Database:
+    # CAZAR_SQLITE=<arquivo> usa o substituto local em vez do Azure;
+    # CAZAR_FALHAS=<taxa> (0 a 1) injeta falhas transitórias nele
+    caminho = os.getenv("CAZAR_SQLITE")
+    if caminho:
+        taxa_falhas = float(os.getenv("CAZAR_FALHAS", "0"))
+        if taxa_falhas:
+            return DatabaseComFalhas(caminho, taxa_falhas)
+        return DatabaseLocal(caminho)
+    return Database()
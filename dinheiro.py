@@ -0,0 +1,150 @@
+from array import array
+from operator import attrgetter
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Iterable, List, Union
+
+# Valores em dinheiro como inteiro de centavos (cabe em int64: o maior
+# DECIMAL(14,2) do banco tem 14 dígitos). Soma e comparação são aritmética de
+# inteiros, sem arredondamento de float nem o custo do Decimal; a conversão
+# para reais só acontece na borda (texto digitado, parâmetros do banco).
+
+_CENTAVO = Decimal("0.01")
+_ZEROS = ("00", "0", "")  # completa as casas depois da vírgula
+_FRACOES = tuple(f",{c:02d}" for c in range(100))  # ",00" a ",99"
+_centavos_de = attrgetter("centavos")
+
+def centavos_de_texto(texto: str) -> int:
+    # pt-BR: "R$ 1.500,00", "1500", "1.500,5", "-R$ 20,00". O ponto é sempre
+    # separador de milhar, como na digitação dos formulários. O int() valida
+    # o resto (sinal e dígitos) em C.
+    limpo = texto.replace("R$", "").replace(".", "").replace(" ", "")
+    inteiro, _, fracao = limpo.partition(",")
+    if not (inteiro or fracao) or len(fracao) > 2 or "_" in limpo or not limpo.isascii():
+        raise ValueError(f"Valor inválido: {texto!r}")
+    try:
+        return int(inteiro + fracao + _ZEROS[len(fracao)])
+    except ValueError:
+        raise ValueError(f"Valor inválido: {texto!r}") from None
+
+def texto_de_centavos(centavos: int) -> str:
+    # Só aritmética de inteiros, exata para qualquer int64 (centavos / 100 em
+    # float já erra o centavo acima de ~2**46)
+    reais, resto = divmod(abs(centavos), 100)
+    sinal = "-" if centavos < 0 else ""
+    return f"R$ {sinal}{reais:_}{_FRACOES[resto]}".replace("_", ".")
+
+def parsear_lote(textos: Iterable[str]) -> array:
+    # Centavos num array int64 contíguo (np.frombuffer lê sem cópia)
+    return array("q", map(centavos_de_texto, textos))
+
+def formatar_lote(centavos: Iterable[int]) -> List[str]:
+    # O mesmo que texto_de_centavos, sem uma chamada de função por valor
+    return [
+        f"R$ {c // 100:_}{_FRACOES[c % 100]}".replace("_", ".") if c >= 0
+        else f"R$ -{-c // 100:_}{_FRACOES[-c % 100]}".replace("_", ".")
+        for c in centavos
+    ]
+
+def somar(valores: Iterable["Dinheiro"]) -> "Dinheiro":
+    # Soma os inteiros direto, sem criar um Dinheiro por parcela
+    return Dinheiro(sum(map(_centavos_de, valores)))
+
+class Dinheiro:
+    __slots__ = ("centavos",)
+
+    def __init__(self, centavos: int = 0):
+        self.centavos = centavos
+
+    @classmethod
+    def de_texto(cls, texto: str) -> "Dinheiro":
+        return cls(centavos_de_texto(texto))
+
+    @classmethod
+    def de_reais(cls, valor: Union[int, str, Decimal]) -> "Dinheiro":
+        # Decimal/int/str em reais; float não é aceito de propósito
+        if isinstance(valor, float):
+            raise TypeError("Use Decimal ou texto para valores em reais")
+        valor = Decimal(valor).quantize(_CENTAVO, rounding=ROUND_HALF_UP)
+        return cls(int(valor.scaleb(2)))
+
+    def em_reais(self) -> Decimal:
+        # Para parâmetros DECIMAL do banco: exato
+        return Decimal(self.centavos).scaleb(-2)
+
+    def __add__(self, outro):
+        if isinstance(outro, Dinheiro):
+            return Dinheiro(self.centavos + outro.centavos)
+        return NotImplemented
+
+    def __radd__(self, outro):
+        # sum() começa do 0
+        if outro == 0:
+            return self
+        return NotImplemented
+
+    def __sub__(self, outro):
+        if isinstance(outro, Dinheiro):
+            return Dinheiro(self.centavos - outro.centavos)
+        return NotImplemented
+
+    def __neg__(self):
+        return Dinheiro(-self.centavos)
+
+    def __mul__(self, fator):
+        if isinstance(fator, int):
+            return Dinheiro(self.centavos * fator)
+        return NotImplemented
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, divisor):
+        # Divisão por quantidade, arredondando o meio centavo para cima
+        if isinstance(divisor, int) and divisor:
+            quociente, resto = divmod(self.centavos, divisor)
+            if 2 * resto >= divisor:
+                quociente += 1
+            return Dinheiro(quociente)
+        return NotImplemented
+
+    def __eq__(self, outro):
+        if isinstance(outro, Dinheiro):
+            return self.centavos == outro.centavos
+        return NotImplemented
+
+    def __lt__(self, outro):
+        if isinstance(outro, Dinheiro):
+            return self.centavos < outro.centavos
+        return NotImplemented
+
+    def __le__(self, outro):
+        if isinstance(outro, Dinheiro):
+            return self.centavos <= outro.centavos
+        return NotImplemented
+
+    def __gt__(self, outro):
+        if isinstance(outro, Dinheiro):
+            return self.centavos > outro.centavos
+        return NotImplemented
+
+    def __ge__(self, outro):
+        if isinstance(outro, Dinheiro):
+            return self.centavos >= outro.centavos
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(self.centavos)
+
+    def __bool__(self):
+        return self.centavos != 0
+
+    def __str__(self):
+        return texto_de_centavos(self.centavos)
+
+    def __format__(self, especificacao):
+        # Sem especificação: "R$ 1.500,00"; com, formata o valor em reais
+        if not especificacao:
+            return texto_de_centavos(self.centavos)
+        return format(self.em_reais(), especificacao)
+
+    def __repr__(self):
+        return f"Dinheiro({self.centavos})"
@@ -0,0 +1,215 @@
+import heapq
+import math
+import re
+import unicodedata
+from collections import defaultdict
+from dataclasses import dataclass, field
+from itertools import combinations
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Normalização e busca aproximada de fornecedores.
+# "Buffet Sabor" e "buffet sabor ltda" viram a mesma chave normalizada; nomes
+# parecidos (erros de digitação, abreviações) são encontrados por um índice
+# invertido de trigramas, sem comparar com todos os nomes cadastrados.
+
+# Sufixos societários ignorados na comparação
+SUFIXOS = {"ltda", "me", "mei", "epp", "eireli", "sa", "s a", "cia", "limitada"}
+
+_NAO_ALFANUMERICO = re.compile(r"[^0-9a-z]+")
+
+def normalizar(nome: str) -> str:
+    sem_acentos = unicodedata.normalize("NFKD", nome)
+    sem_acentos = "".join(c for c in sem_acentos if not unicodedata.combining(c))
+    palavras = _NAO_ALFANUMERICO.sub(" ", sem_acentos.casefold()).split()
+    while len(palavras) > 1 and palavras[-1] in SUFIXOS:
+        palavras.pop()
+    if len(palavras) > 2 and " ".join(palavras[-2:]) in SUFIXOS:
+        palavras = palavras[:-2]
+    return " ".join(palavras)
+
+def trigramas(normalizado: str) -> set:
+    texto = f"  {normalizado} "
+    return {texto[i:i + 3] for i in range(len(texto) - 2)}
+
+def _teto(valor: float) -> int:
+    # ceil tolerante ao arredondamento: 0.7 * 10 = 7.000000000000001
+    return math.ceil(valor - 1e-9)
+
+def _preferida(variantes: Dict[str, int]) -> str:
+    # Grafia mais usada; no empate, a que tem maiúsculas e depois a mais curta
+    return max(variantes, key=lambda nome: (
+        variantes[nome], not nome.islower(), -len(nome), nome
+    ))
+
+@dataclass
+class Grupo:
+    canonico: str
+    variantes: Dict[str, int] = field(default_factory=dict)  # nome original -> orçamentos
+
+    @property
+    def total(self) -> int:
+        return sum(self.variantes.values())
+
+class IndiceFornecedores:
+    # Montado de uma vez a partir das contagens do banco; o cache da sessão
+    # descarta e remonta o índice quando Orcamentos muda.
+    def __init__(self, contagens: Dict[str, int], minimo: float = 0.5):
+        self.minimo = minimo  # menor similaridade aceita por buscar/agrupar
+        variantes: Dict[str, Dict[str, int]] = {}
+        for nome, quantidade in contagens.items():
+            normalizado = normalizar(nome) if nome else ""
+            if normalizado:
+                grafias = variantes.setdefault(normalizado, {})
+                grafias[nome] = grafias.get(nome, 0) + quantidade
+
+        self.normalizados: List[str] = list(variantes)
+        self.originais: List[Dict[str, int]] = list(variantes.values())
+        self.totais: List[int] = [sum(v.values()) for v in self.originais]
+        self._trigramas: List[set] = [trigramas(n) for n in self.normalizados]
+
+        # Índice completo (typeahead) e índice só dos prefixos raros (Jaccard)
+        self._postings: Dict[str, List[int]] = defaultdict(list)
+        for posicao, grams in enumerate(self._trigramas):
+            for gram in grams:
+                self._postings[gram].append(posicao)
+        self._prefixos: Dict[str, List[int]] = defaultdict(list)
+        for posicao, grams in enumerate(self._trigramas):
+            for gram in self._prefixo(grams, minimo):
+                self._prefixos[gram].append(posicao)
+
+    def __len__(self):
+        return len(self.normalizados)
+
+    def nome_principal(self, posicao: int) -> str:
+        # Grafia preferida entre as que normalizam igual
+        return _preferida(self.originais[posicao])
+
+    def _prefixo(self, grams: set, minimo: float) -> List[str]:
+        # Filtro de prefixo: dois conjuntos com pelo menos k trigramas em comum
+        # compartilham algum dos (n - k + 1) primeiros numa ordem global fixa.
+        # A ordem é do mais raro ao mais comum, então as listas percorridas são
+        # as menores. Trigramas desconhecidos (só na consulta) vêm primeiro.
+        ordenados = sorted(grams, key=lambda g: (len(self._postings.get(g, ())), g))
+        return ordenados[:len(ordenados) - math.ceil(minimo * len(ordenados)) + 1]
+
+    def _melhores(self, resultados: List[Tuple[int, float]], limite: int):
+        # Mais parecidos primeiro; no empate, o fornecedor com mais orçamentos
+        return heapq.nlargest(limite, resultados, key=lambda r: (r[1], self.totais[r[0]]))
+
+    def _vizinhos(self, grams: set, minimo: float) -> List[Tuple[int, float]]:
+        # Jaccard >= minimo implica |A ∩ B| >= minimo * max(|A|, |B|), então o
+        # prefixo de cada lado (calculado com o próprio tamanho) é suficiente
+        tamanho = len(grams)
+        menor, maior = minimo * tamanho, tamanho / minimo
+        vistos = set()
+        resultados = []
+        for gram in self._prefixo(grams, minimo):
+            for posicao in self._prefixos.get(gram, ()):
+                if posicao in vistos:
+                    continue
+                vistos.add(posicao)
+                outros = self._trigramas[posicao]
+                if not menor <= len(outros) <= maior:
+                    continue
+                comuns = len(grams & outros)
+                similaridade = comuns / (tamanho + len(outros) - comuns)
+                if similaridade >= minimo:
+                    resultados.append((posicao, similaridade))
+        return resultados
+
+    def buscar(self, consulta: str, limite: int = 5,
+               minimo: Optional[float] = None) -> List[Tuple[int, float]]:
+        # Similaridade de Jaccard entre os trigramas do nome inteiro.
+        # Abaixo do mínimo do índice o filtro de prefixo perderia resultados.
+        minimo = max(minimo or self.minimo, self.minimo)
+        normalizado = normalizar(consulta)
+        if not normalizado:
+            return []
+        return self._melhores(self._vizinhos(trigramas(normalizado), minimo), limite)
+
+    def sugerir(self, texto: str, limite: int = 5, minimo: float = 0.6) -> List[str]:
+        # Typeahead: nomes que contêm a maior parte do que foi digitado
+        # (contenção em vez de Jaccard, o texto ainda está incompleto)
+        normalizado = normalizar(texto)
+        if not normalizado:
+            return []
+        grams = trigramas(normalizado)
+        grams.discard(normalizado[-2:] + " ")  # a última palavra pode continuar
+        if not grams:
+            return []
+
+        # Quem tem ceil(minimo * n) trigramas da consulta tem algum dos
+        # (n - ceil(minimo * n) + 1) mais raros
+        ordenados = sorted(grams, key=lambda g: len(self._postings.get(g, ())))
+        necessarios = math.ceil(minimo * len(grams))
+        candidatos = set().union(*(
+            self._postings.get(gram, ()) for gram in ordenados[:len(grams) - necessarios + 1]
+        ))
+        resultados = []
+        for posicao in candidatos:
+            comuns = len(grams & self._trigramas[posicao])
+            if comuns >= necessarios:
+                resultados.append((posicao, comuns / len(grams)))
+        return [self.nome_principal(posicao) for posicao, _ in self._melhores(resultados, limite)]
+
+    def _pares(self, minimo: float) -> List[List[int]]:
+        # Todos os pares com Jaccard >= minimo numa única junção: os nomes
+        # entram do menor para o maior e cada um só é comparado com os que já
+        # entraram, então cada par é visto uma vez. Com minimo > 1/3 dois nomes
+        # parecidos têm pelo menos dois trigramas em comum, e os dois primeiros
+        # (na ordem global, do mais raro) caem no prefixo de cada lado; a chave
+        # é esse par de trigramas. Um trigrama raro sozinho é comum em nomes
+        # que só dividem um sobrenome, um par já é bem mais seletivo. Como o
+        # nome indexado nunca é maior que o da consulta, o prefixo indexado é
+        # mais curto que o consultado.
+        raros = sorted(self._postings, key=lambda g: (len(self._postings[g]), g))
+        codigo = {gram: i for i, gram in enumerate(raros)}
+        base = len(raros)  # chave do par (a, b): a * base + b
+        ordenados = [sorted(codigo[g] for g in grams) for grams in self._trigramas]
+        tamanhos = [len(o) for o in ordenados]
+        proporcao = minimo / (1 + minimo)  # |A ∩ B| >= proporcao * (|A| + |B|)
+        indice: Dict[int, List[int]] = defaultdict(list)
+        vizinhos: List[List[int]] = [[] for _ in self.normalizados]
+        for x in sorted(range(len(ordenados)), key=tamanhos.__getitem__):
+            grams, tamanho = ordenados[x], tamanhos[x]
+            menor = minimo * tamanho
+            candidatos = set()
+            for a, b in combinations(grams[:tamanho - _teto(minimo * tamanho) + 2], 2):
+                for y in indice.get(a * base + b, ()):
+                    if tamanhos[y] >= menor:
+                        candidatos.add(y)
+            trigramas_x = self._trigramas[x]
+            for y in candidatos:
+                comuns = len(trigramas_x & self._trigramas[y])
+                if comuns / (tamanho + tamanhos[y] - comuns) >= minimo:
+                    vizinhos[x].append(y)
+                    vizinhos[y].append(x)
+            for a, b in combinations(grams[:tamanho - _teto(2 * proporcao * tamanho) + 2], 2):
+                indice[a * base + b].append(x)
+        return vizinhos
+
+    def agrupar(self, minimo: float = 0.6) -> List[Grupo]:
+        # Deduplicação em lote. Os fornecedores com mais orçamentos viram
+        # referência e absorvem os vizinhos ainda sem grupo; comparar sempre
+        # com a referência evita o encadeamento (A~B, B~C, mas A≁C) de uma
+        # união transitiva.
+        minimo = max(minimo, self.minimo)
+        if minimo <= 1 / 3:
+            raise ValueError("agrupar exige similaridade mínima acima de 1/3")
+        vizinhos = self._pares(minimo)
+        grupo_de: List[Optional[int]] = [None] * len(self.normalizados)
+        grupos = []
+        for referencia in sorted(range(len(self.normalizados)), key=lambda p: -self.totais[p]):
+            if grupo_de[referencia] is not None:
+                continue
+            grupo_de[referencia] = referencia
+            variantes = dict(self.originais[referencia])
+            for vizinho in vizinhos[referencia]:
+                if grupo_de[vizinho] is None:
+                    grupo_de[vizinho] = referencia
+                    variantes.update(self.originais[vizinho])
+            grupos.append(Grupo(_preferida(variantes), variantes))
+        return grupos
+
+def duplicados(grupos: Iterable[Grupo]) -> List[Grupo]:
+    return [g for g in grupos if len(g.variantes) > 1]
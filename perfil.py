@@ -0,0 +1,214 @@
+import cProfile
+import os
+import pstats
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import streamlit as st
+
+# Perfil opcional dos reruns do Streamlit.
+# Ativação: CAZAR_PERFIL=1 (ou ?perfil=1 na URL) mede as seções nomeadas;
+# CAZAR_PERFIL=cprofile (ou ?perfil=cprofile) também captura o cProfile.
+# Saída em CAZAR_PERFIL_DIR (padrão: perfis/) no formato de pilhas colapsadas,
+# aceito pelo flamegraph.pl, speedscope e inferno.
+
+DIRETORIO_PADRAO = "perfis"
+
+# Pilhas do cProfile abaixo deste tempo (s) são descartadas
+_TEMPO_MINIMO_PILHA = 1e-5
+_PROFUNDIDADE_MAXIMA = 64
+
+_NULO = nullcontext()
+_atual = threading.local()
+# Um cProfile ativo por vez no processo: a partir do Python 3.12 ele usa o
+# sys.monitoring, que só aceita um perfilador (um segundo enable() levanta
+# ValueError), e mede as threads de todas as sessões, não só a do rerun.
+# Quem não consegue a trava mede só as seções.
+_trava_cprofile = threading.Lock()
+
+class _Secao:
+    __slots__ = ("perfilador", "nome", "ordem", "inicio", "filhos")
+
+    def __init__(self, perfilador, nome):
+        self.perfilador = perfilador
+        self.nome = nome
+
+    def __enter__(self):
+        self.filhos = 0
+        self.ordem = self.perfilador._abertas
+        self.perfilador._abertas += 1
+        self.perfilador._pilha.append(self)
+        self.inicio = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        total = time.perf_counter_ns() - self.inicio
+        pilha = self.perfilador._pilha
+        caminho = tuple(s.nome for s in pilha)
+        pilha.pop()
+        if pilha:
+            pilha[-1].filhos += total
+        self.perfilador.secoes.append((self.ordem, caminho, total, total - self.filhos))
+        return False
+
+class Perfilador:
+    def __init__(self, cprofile: bool = False, diretorio: str = DIRETORIO_PADRAO):
+        self.diretorio = diretorio
+        # (ordem de abertura, caminho, tempo total ns, tempo próprio ns)
+        self.secoes: List[Tuple[int, Tuple[str, ...], int, int]] = []
+        self._pilha: List[_Secao] = []
+        self._abertas = 0
+        self.cprofile = cprofile
+        self.cprofile_ocupado = False  # pedido, mas outra sessão estava usando
+        self._perfil: Optional[cProfile.Profile] = None  # criado ao obter a trava
+        self._com_trava = False
+        self._raiz = _Secao(self, "rerun")
+
+    def secao(self, nome: str) -> _Secao:
+        return _Secao(self, nome)
+
+    def iniciar(self):
+        self._raiz.__enter__()
+        if not self.cprofile:
+            return
+        if not _trava_cprofile.acquire(blocking=False):
+            self.cprofile_ocupado = True
+            return
+        perfil = cProfile.Profile()
+        try:
+            perfil.enable()
+        except ValueError:
+            # Outra ferramenta (depurador, cobertura) já está perfilando
+            _trava_cprofile.release()
+            self.cprofile_ocupado = True
+            return
+        self._perfil = perfil
+        self._com_trava = True
+
+    def finalizar(self):
+        if self._com_trava:
+            self._perfil.disable()
+            self._com_trava = False
+            _trava_cprofile.release()
+        # Fecha seções deixadas abertas por st.rerun()/st.stop()
+        while self._pilha:
+            self._pilha[-1].__exit__(None, None, None)
+
+    @property
+    def total_ms(self) -> float:
+        return self.secoes[-1][2] / 1e6 if self.secoes else 0.0
+
+    def linhas_colapsadas(self) -> List[str]:
+        # Tempo próprio de cada pilha em microssegundos
+        return [
+            f"{';'.join(caminho)} {proprio // 1000}"
+            for _, caminho, _, proprio in self.secoes
+            if proprio >= 1000
+        ]
+
+    def salvar(self):
+        os.makedirs(self.diretorio, exist_ok=True)
+        with open(os.path.join(self.diretorio, "secoes.folded"), "a", encoding="utf-8") as f:
+            for linha in self.linhas_colapsadas():
+                f.write(linha + "\n")
+
+        if self._perfil:
+            base = os.path.join(
+                self.diretorio,
+                f"rerun-{datetime.now():%Y%m%d-%H%M%S-%f}"
+            )
+            stats = pstats.Stats(self._perfil)
+            stats.dump_stats(base + ".prof")
+            with open(base + ".folded", "w", encoding="utf-8") as f:
+                for pilha, segundos in pilhas_cprofile(stats).items():
+                    f.write(f"{pilha} {int(segundos * 1e6)}\n")
+
+def pilhas_cprofile(stats: pstats.Stats) -> Dict[str, float]:
+    # O cProfile só guarda o grafo chamador -> chamado, não as pilhas
+    # completas. Reconstruímos pilhas aproximadas descendo a partir das raízes
+    # e repartindo o tempo de cada função entre os chamadores na proporção do
+    # tempo acumulado que cada um gerou.
+    entradas = stats.stats
+    chamados: Dict[tuple, List[tuple]] = {}
+    for funcao, (_, _, _, _, chamadores) in entradas.items():
+        for chamador in chamadores:
+            chamados.setdefault(chamador, []).append(funcao)
+
+    def nome(funcao):
+        arquivo, linha, func = funcao
+        return f"{func} ({os.path.basename(arquivo)}:{linha})" if linha else func
+
+    pilhas: Dict[str, float] = {}
+
+    def descer(funcao, fracao, caminho, vistos):
+        _, _, proprio, acumulado, _ = entradas[funcao]
+        rotulo = caminho + (nome(funcao),)
+        if proprio * fracao >= _TEMPO_MINIMO_PILHA:
+            chave = ";".join(rotulo)
+            pilhas[chave] = pilhas.get(chave, 0.0) + proprio * fracao
+        if len(rotulo) >= _PROFUNDIDADE_MAXIMA:
+            return
+        for filho in chamados.get(funcao, ()):
+            if filho in vistos:
+                continue
+            filho_acumulado = entradas[filho][3]
+            aresta = entradas[filho][4][funcao][3]
+            if not filho_acumulado:
+                continue
+            nova_fracao = fracao * aresta / filho_acumulado
+            if filho_acumulado * nova_fracao >= _TEMPO_MINIMO_PILHA:
+                descer(filho, nova_fracao, rotulo, vistos | {filho})
+
+    for funcao, (_, _, _, _, chamadores) in entradas.items():
+        if not chamadores:
+            descer(funcao, 1.0, ("rerun",), {funcao})
+    return pilhas
+
+def secao(nome: str):
+    # Sem perfil ativo custa um getattr e devolve um contexto vazio
+    perfilador = getattr(_atual, "perfilador", None)
+    if perfilador is None:
+        return _NULO
+    return perfilador.secao(nome)
+
+def modo_perfil() -> Optional[str]:
+    modo = os.getenv("CAZAR_PERFIL") or st.query_params.get("perfil")
+    if not modo or modo.lower() in ("0", "false", "nao", "não"):
+        return None
+    return "cprofile" if modo.lower() == "cprofile" else "secoes"
+
+@contextmanager
+def rerun():
+    modo = modo_perfil()
+    if modo is None:
+        yield None
+        return
+
+    perfilador = Perfilador(
+        cprofile=modo == "cprofile",
+        diretorio=os.getenv("CAZAR_PERFIL_DIR", DIRETORIO_PADRAO)
+    )
+    _atual.perfilador = perfilador
+    try:
+        perfilador.iniciar()
+        yield perfilador
+    finally:
+        perfilador.finalizar()
+        _atual.perfilador = None
+        perfilador.salvar()
+
+def exibir_no_sidebar(perfilador: Optional[Perfilador]):
+    if perfilador is None:
+        return
+
+    with st.sidebar.expander(f"⏱️ Perfil do rerun: {perfilador.total_ms:.1f} ms"):
+        # As seções terminam de dentro para fora; exibe na ordem de abertura
+        for _, caminho, total, proprio in sorted(perfilador.secoes):
+            recuo = " " * (len(caminho) - 1)
+            st.text(f"{recuo}{caminho[-1]}: {total / 1e6:.1f} ms (próprio {proprio / 1e6:.1f})")
+        if perfilador.cprofile_ocupado:
+            st.caption("cProfile em uso por outra sessão: só as seções foram medidas")
+        st.caption(f"Pilhas colapsadas em {perfilador.diretorio}/")
@@ -0,0 +1,374 @@
+import gc
+import mmap
+import os
+import struct
+import threading
+import zlib
+from datetime import datetime, timedelta
+from typing import Iterator, Optional, Tuple
+
+from casamento_manager import ControleFinanceiro, Demanda, GestorCasamento, Orcamento
+from dinheiro import Dinheiro
+
+# Persistência do GestorCasamento em log de eventos binário + snapshots.
+#
+# Cada mutação (criar_demanda, adicionar_orcamento, definir_orcamento_total,
+# registrar_gasto) vira um registro no eventos.log. As escritas são agrupadas em
+# memória e gravadas com um único fsync a cada `intervalo_fsync` segundos ou
+# `eventos_por_fsync` eventos. A compactação grava o estado atual em
+# estado.snap (no mesmo formato de registros) e recomeça o log, para que a
+# recuperação não precise reler o histórico inteiro. Alterações feitas direto
+# nos atributos (ex.: demanda.status) não passam pelo log e não são persistidas.
+#
+# Os registros (tipo u8, tamanho u32, payload) são gravados em blocos, um por
+# fsync, cada um com tamanho e crc32; um bloco incompleto ou corrompido marca o
+# fim do log. Os arquivos começam com um cabeçalho de magia, versão e geração;
+# o log só é reaplicado se for da mesma geração do snapshot, assim uma queda no
+# meio da compactação não duplica eventos. Um log de geração mais nova que o
+# snapshot (snapshot perdido) interrompe a recuperação em vez de ser descartado.
+
+MAGIA_LOG = b"CZLG"
+MAGIA_SNAPSHOT = b"CZSN"
+VERSAO = 2  # 2: valores em centavos (int64) em vez de texto Decimal
+
+CRIAR_DEMANDA = 1
+ADICIONAR_ORCAMENTO = 2
+DEFINIR_ORCAMENTO_TOTAL = 3
+REGISTRAR_GASTO = 4
+
+_CABECALHO_ARQUIVO = struct.Struct("<4sHQ")  # magia, versão, geração
+_BLOCO = struct.Struct("<II")                # tamanho, crc32
+_REGISTRO = struct.Struct("<BI")             # tipo, tamanho
+_DEMANDA = struct.Struct("<BqII")            # prioridade, data, len(nome), len(descricao)
+_ORCAMENTO = struct.Struct("<IqqII")         # demanda, data, centavos, len(fornecedor), len(descricao)
+_TOTAL = struct.Struct("<q")                 # centavos
+_GASTO = struct.Struct("<qqI")               # data, centavos, len(descricao)
+
+_EPOCA = datetime(1970, 1, 1)
+_MICROSSEGUNDO = timedelta(microseconds=1)
+
+def _micros(data: datetime) -> int:
+    # Datas ingênuas (sem fuso) convertidas sem passar pelo fuso local
+    return (data - _EPOCA) // _MICROSSEGUNDO
+
+def _registro(tipo: int, payload: bytes) -> bytes:
+    return _REGISTRO.pack(tipo, len(payload)) + payload
+
+def bloco(registros) -> bytes:
+    return _BLOCO.pack(len(registros), zlib.crc32(registros)) + registros
+
+def registro_demanda(demanda) -> bytes:
+    nome = demanda.nome.encode()
+    descricao = demanda.descricao.encode()
+    return _registro(CRIAR_DEMANDA, _DEMANDA.pack(
+        int(demanda.prioridade), _micros(demanda.data_criacao), len(nome), len(descricao)
+    ) + nome + descricao)
+
+def registro_orcamento(demanda_id: int, orcamento) -> bytes:
+    fornecedor = orcamento.fornecedor.encode()
+    descricao = orcamento.descricao.encode()
+    return _registro(ADICIONAR_ORCAMENTO, _ORCAMENTO.pack(
+        demanda_id, _micros(orcamento.data_cotacao),
+        orcamento.valor.centavos, len(fornecedor), len(descricao)
+    ) + fornecedor + descricao)
+
+def registro_orcamento_total(valor: Dinheiro) -> bytes:
+    return _registro(DEFINIR_ORCAMENTO_TOTAL, _TOTAL.pack(valor.centavos))
+
+def registro_gasto(gasto: dict) -> bytes:
+    descricao = gasto["descricao"].encode()
+    return _registro(REGISTRAR_GASTO, _GASTO.pack(
+        _micros(gasto["data"]), gasto["valor"].centavos, len(descricao)
+    ) + descricao)
+
+def aplicar(gestor: GestorCasamento, dados, inicio: int) -> Tuple[int, int]:
+    # Reaplica os blocos a partir de `inicio` direto nas estruturas, sem passar
+    # pelo log. Para no primeiro bloco incompleto ou corrompido (escrita
+    # interrompida) e devolve (eventos aplicados, posição final).
+    # Laço único e sem chamadas intermediárias: é o caminho quente da
+    # recuperação (milhões de eventos).
+    demandas = gestor.demandas
+    unpack_registro = _REGISTRO.unpack_from
+    unpack_orcamento = _ORCAMENTO.unpack_from
+    unpack_demanda = _DEMANDA.unpack_from
+    unpack_gasto = _GASTO.unpack_from
+    tamanho_registro = _REGISTRO.size
+    epoca = _EPOCA
+    fim = len(dados)
+    posicao = inicio
+    total = 0
+
+    while posicao + _BLOCO.size <= fim:
+        tamanho_bloco, crc = _BLOCO.unpack_from(dados, posicao)
+        p = posicao + _BLOCO.size
+        fim_bloco = p + tamanho_bloco
+        if fim_bloco > fim or zlib.crc32(dados[p:fim_bloco]) != crc:
+            break
+
+        while p < fim_bloco:
+            tipo, tamanho = unpack_registro(dados, p)
+            p += tamanho_registro
+            proximo = p + tamanho
+
+            if tipo == ADICIONAR_ORCAMENTO:
+                demanda_id, data, centavos, n_fornecedor, n_descricao = unpack_orcamento(dados, p)
+                p += _ORCAMENTO.size
+                fornecedor = dados[p:p + n_fornecedor].decode()
+                p += n_fornecedor
+                descricao = dados[p:p + n_descricao].decode()
+                # Equivale a adicionar_orcamento, preservando a data original
+                demandas[demanda_id].orcamentos.append(Orcamento(
+                    fornecedor, Dinheiro(centavos), descricao, epoca + timedelta(0, 0, data)
+                ))
+            elif tipo == CRIAR_DEMANDA:
+                prioridade, data, n_nome, n_descricao = unpack_demanda(dados, p)
+                p += _DEMANDA.size
+                nome = dados[p:p + n_nome].decode()
+                p += n_nome
+                descricao = dados[p:p + n_descricao].decode()
+                # Equivale a criar_demanda, preservando a data original
+                demanda = Demanda(nome, descricao, prioridade, "Pendente",
+                                  epoca + timedelta(0, 0, data))
+                demanda.id = len(demandas)
+                demandas.append(demanda)
+            elif tipo == REGISTRAR_GASTO:
+                data, centavos, n_descricao = unpack_gasto(dados, p)
+                p += _GASTO.size
+                descricao = dados[p:p + n_descricao].decode()
+                ControleFinanceiro.registrar_gasto(
+                    gestor.controle_financeiro, descricao, Dinheiro(centavos),
+                    epoca + timedelta(0, 0, data)
+                )
+            elif tipo == DEFINIR_ORCAMENTO_TOTAL:
+                (centavos,) = _TOTAL.unpack_from(dados, p)
+                GestorCasamento.definir_orcamento_total(gestor, Dinheiro(centavos))
+            else:
+                raise ValueError(f"Tipo de evento desconhecido: {tipo}")
+
+            p = proximo
+            total += 1
+
+        posicao = fim_bloco
+
+    return total, posicao
+
+def _ler_cabecalho(dados, magia: bytes) -> int:
+    if len(dados) < _CABECALHO_ARQUIVO.size:
+        raise ValueError("Arquivo sem cabeçalho")
+    lida, versao, geracao = _CABECALHO_ARQUIVO.unpack_from(dados, 0)
+    if lida != magia or versao != VERSAO:
+        raise ValueError(f"Arquivo inválido: {lida!r} versão {versao}")
+    return geracao
+
+def _sincronizar_diretorio(diretorio: str):
+    # Torna duráveis o rename, a remoção e a criação de arquivos. No Windows
+    # não há fsync de diretório (o NTFS registra os metadados no journal).
+    if os.name == "nt":
+        return
+    fd = os.open(diretorio, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+class LogEventos:
+    def __init__(self, caminho: str, geracao: int, intervalo_fsync: float = 0.05,
+                 eventos_por_fsync: int = 10_000):
+        self.caminho = caminho
+        self.intervalo_fsync = intervalo_fsync
+        self.eventos_por_fsync = eventos_por_fsync
+        self.eventos = 0
+        self._buffer = bytearray()
+        self._pendentes = 0
+        self._lock = threading.Lock()
+        self._arquivo = open(caminho, "ab")
+        if self._arquivo.tell() == 0:
+            self._arquivo.write(_CABECALHO_ARQUIVO.pack(MAGIA_LOG, VERSAO, geracao))
+            self._sincronizar_arquivo()
+
+        # Garante o fsync mesmo quando não chegam novos eventos
+        self._parar = threading.Event()
+        self._thread = threading.Thread(
+            target=self._sincronizar_periodicamente, name="log-eventos", daemon=True
+        )
+        self._thread.start()
+
+    def anexar(self, registro: bytes):
+        with self._lock:
+            self._buffer += registro
+            self._pendentes += 1
+            self.eventos += 1
+            if self._pendentes >= self.eventos_por_fsync:
+                self._descarregar()
+
+    def _descarregar(self):
+        if not self._buffer:
+            return
+        self._arquivo.write(bloco(self._buffer))
+        self._sincronizar_arquivo()
+        self._buffer.clear()
+        self._pendentes = 0
+
+    def _sincronizar_arquivo(self):
+        self._arquivo.flush()
+        os.fsync(self._arquivo.fileno())
+
+    def _sincronizar_periodicamente(self):
+        while not self._parar.wait(self.intervalo_fsync):
+            self.sincronizar()
+
+    def sincronizar(self):
+        with self._lock:
+            self._descarregar()
+
+    def fechar(self):
+        self._parar.set()
+        self._thread.join()
+        self.sincronizar()
+        self._arquivo.close()
+
+class GestorPersistente(GestorCasamento):
+    def __init__(self, diretorio: str, intervalo_fsync: float = 0.05,
+                 compactar_apos: Optional[int] = 1_000_000):
+        super().__init__()
+        self.diretorio = diretorio
+        self.compactar_apos = compactar_apos
+        self._intervalo_fsync = intervalo_fsync
+        self._caminho_snapshot = os.path.join(diretorio, "estado.snap")
+        self._caminho_log = os.path.join(diretorio, "eventos.log")
+        os.makedirs(diretorio, exist_ok=True)
+
+        self.geracao, eventos = self._restaurar()
+        self.log = LogEventos(self._caminho_log, self.geracao, intervalo_fsync)
+        self.log.eventos = eventos
+
+    def _restaurar(self) -> Tuple[int, int]:
+        # Milhões de objetos novos disparariam várias coletas completas do gc
+        gc_ativo = gc.isenabled()
+        gc.disable()
+        try:
+            return self._restaurar_arquivos()
+        finally:
+            if gc_ativo:
+                gc.enable()
+
+    def _restaurar_arquivos(self) -> Tuple[int, int]:
+        geracao = 0
+        if os.path.exists(self._caminho_snapshot):
+            with open(self._caminho_snapshot, "rb") as f, \
+                    mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as dados:
+                geracao = _ler_cabecalho(dados, MAGIA_SNAPSHOT)
+                aplicar(self, dados, _CABECALHO_ARQUIVO.size)
+
+        eventos = 0
+        tamanho_log = os.path.getsize(self._caminho_log) if os.path.exists(self._caminho_log) else 0
+        if tamanho_log < _CABECALHO_ARQUIVO.size:
+            # Queda durante a gravação do cabeçalho: o log ainda não tinha eventos
+            if tamanho_log:
+                with open(self._caminho_log, "r+b") as f:
+                    f.truncate(0)
+        else:
+            with open(self._caminho_log, "r+b") as f:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as dados:
+                    geracao_log = _ler_cabecalho(dados, MAGIA_LOG)
+                    if geracao_log > geracao:
+                        # Snapshot mais velho que o log: o rename da compactação
+                        # se perdeu ou um estado.snap antigo foi copiado por
+                        # cima. Descartar o log apagaria os eventos gravados
+                        # desde então.
+                        raise ValueError(
+                            f"Log da geração {geracao_log} com snapshot da geração "
+                            f"{geracao} em {self.diretorio}"
+                        )
+                    tamanho = len(dados)
+                    if geracao_log == geracao:
+                        eventos, fim = aplicar(self, dados, _CABECALHO_ARQUIVO.size)
+
+                if geracao_log < geracao:
+                    # Log anterior ao snapshot (queda durante a compactação)
+                    f.truncate(0)
+                elif fim < tamanho:
+                    # Descarta a cauda de uma escrita interrompida
+                    f.truncate(fim)
+
+        # O controle restaurado precisa voltar a registrar no log
+        if self.controle_financeiro:
+            restaurado = self.controle_financeiro
+            self.controle_financeiro = ControleFinanceiroPersistente(self, restaurado.orcamento_total)
+            self.controle_financeiro.gastos = restaurado.gastos
+            self.controle_financeiro.saldo = restaurado.saldo
+        return geracao, eventos
+
+    def criar_demanda(self, nome: str, descricao: str, prioridade: int):
+        demanda = super().criar_demanda(nome, descricao, prioridade)
+        self._anexar(registro_demanda(demanda))
+        return demanda
+
+    def adicionar_orcamento(self, demanda, fornecedor: str, valor: Dinheiro, descricao: str):
+        orcamento = super().adicionar_orcamento(demanda, fornecedor, valor, descricao)
+        self._anexar(registro_orcamento(demanda.id, orcamento))
+        return orcamento
+
+    def definir_orcamento_total(self, valor: Dinheiro):
+        self.controle_financeiro = ControleFinanceiroPersistente(self, valor)
+        self._anexar(registro_orcamento_total(valor))
+
+    def registrar_gasto(self, descricao: str, valor: Dinheiro):
+        self.controle_financeiro.registrar_gasto(descricao, valor)
+
+    def _anexar(self, registro: bytes):
+        # A compactação roda aqui, na mutação que cruza compactar_apos, e
+        # bloqueia quem chamou pelo tempo de regravar o estado inteiro (cerca de
+        # 3-4 s com 1M de eventos). Com compactar_apos=None ela não é automática
+        # e o app chama compactar() num momento ocioso.
+        self.log.anexar(registro)
+        if self.compactar_apos is not None and self.log.eventos >= self.compactar_apos:
+            self.compactar()
+
+    def _registros_do_estado(self) -> Iterator[bytes]:
+        for demanda in self.demandas:
+            yield registro_demanda(demanda)
+            for orcamento in demanda.orcamentos:
+                yield registro_orcamento(demanda.id, orcamento)
+        if self.controle_financeiro:
+            yield registro_orcamento_total(self.controle_financeiro.orcamento_total)
+            for gasto in self.controle_financeiro.gastos:
+                yield registro_gasto(gasto)
+
+    def compactar(self):
+        # 1) snapshot da próxima geração em arquivo temporário + rename atômico;
+        # 2) log novo para essa geração. Queda entre 1 e 2 é tratada na leitura.
+        self.log.fechar()
+        geracao = self.geracao + 1
+        temporario = self._caminho_snapshot + ".tmp"
+        with open(temporario, "wb") as f:
+            f.write(_CABECALHO_ARQUIVO.pack(MAGIA_SNAPSHOT, VERSAO, geracao))
+            lote = bytearray()
+            for registro in self._registros_do_estado():
+                lote += registro
+                if len(lote) >= 1 << 20:
+                    f.write(bloco(lote))
+                    lote.clear()
+            if lote:
+                f.write(bloco(lote))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporario, self._caminho_snapshot)
+        _sincronizar_diretorio(self.diretorio)
+
+        os.remove(self._caminho_log)
+        self.geracao = geracao
+        self.log = LogEventos(self._caminho_log, geracao, self._intervalo_fsync)
+        _sincronizar_diretorio(self.diretorio)
+
+    def fechar(self):
+        self.log.fechar()
+
+class ControleFinanceiroPersistente(ControleFinanceiro):
+    def __init__(self, gestor: GestorPersistente, orcamento_total: Dinheiro):
+        super().__init__(orcamento_total)
+        self._gestor = gestor
+
+    def registrar_gasto(self, descricao: str, valor: Dinheiro):
+        super().registrar_gasto(descricao, valor)
+        self._gestor._anexar(registro_gasto(self.gastos[-1]))
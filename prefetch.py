@@ -0,0 +1,92 @@
+import logging
+import threading
+from collections import Counter, defaultdict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Tuple
+
+from cache import CacheConsultas, Dependencia
+
+# Prefetch em segundo plano dos dados das outras páginas do menu lateral.
+# Depois que uma página termina de renderizar, as consultas das páginas que o
+# usuário provavelmente abrirá em seguida são carregadas no cache da sessão.
+# Um pool pequeno é compartilhado por todas as sessões do processo.
+
+# (chave no cache, função de carga, dependências)
+Consulta = Tuple[Any, Callable[[], Any], List[Dependencia]]
+
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="prefetch")
+
+class AgendadorPrefetch:
+    def __init__(self, cache: CacheConsultas, consultas_por_pagina: Dict[str, List[Consulta]]):
+        self.cache = cache
+        self.consultas_por_pagina = consultas_por_pagina
+        self.cancelados = 0
+        self._transicoes: Dict[str, Counter] = defaultdict(Counter)
+        self._pagina_atual = None
+        self._futuros: List[Future] = []
+        self._cancelar = threading.Event()
+        self._lock = threading.Lock()
+
+    def paginas_provaveis(self, pagina: str) -> List[str]:
+        # Ordena as outras páginas pelas navegações já vistas nesta sessão;
+        # empates mantêm a ordem do menu
+        ordem = list(self.consultas_por_pagina)
+        vistas = self._transicoes[pagina]
+        outras = [p for p in ordem if p != pagina]
+        return sorted(outras, key=lambda p: (-vistas[p], ordem.index(p)))
+
+    def pagina_exibida(self, pagina: str):
+        # Chamado a cada rerun; só agenda quando a página muda (reruns na
+        # mesma página refariam consultas que já estão no cache ou em curso)
+        if pagina == self._pagina_atual:
+            return
+        if self._pagina_atual:
+            self._transicoes[self._pagina_atual][pagina] += 1
+        self._pagina_atual = pagina
+
+        self.cancelar()
+        cancelar = self._cancelar = threading.Event()
+        agendadas = set()
+        for proxima in self.paginas_provaveis(pagina):
+            for chave, carregar, dependencias in self.consultas_por_pagina[proxima]:
+                if chave in agendadas or self.cache.contem(chave):
+                    continue
+                agendadas.add(chave)
+                futuro = _executor.submit(
+                    self._carregar, chave, carregar, dependencias, cancelar
+                )
+                self.cache.registrar_carga(chave, futuro)
+                with self._lock:
+                    self._futuros.append(futuro)
+
+    def _carregar(self, chave, carregar, dependencias, cancelar: threading.Event):
+        if cancelar.is_set():
+            return
+        versao = self.cache.versao
+        try:
+            valor = carregar()
+        except Exception as e:
+            logging.error(f"Erro no prefetch de {chave}: {e}")
+            return
+
+        if cancelar.is_set() or not self.cache.guardar(
+            chave, valor, dependencias, versao, prefetch=True
+        ):
+            # Consulta feita, mas o resultado não foi aproveitado
+            self.cache.metricas.prefetch_desperdicados += 1
+
+    def cancelar(self):
+        # Cancela o que ainda não começou; cargas em andamento terminam, mas
+        # o resultado é descartado
+        self._cancelar.set()
+        with self._lock:
+            futuros, self._futuros = self._futuros, []
+        self.cancelados += sum(1 for f in futuros if f.cancel())
+
+    def resumo(self) -> str:
+        m = self.cache.metricas
+        return (
+            f"Prefetch: {m.prefetch_usados}/{m.prefetch_carregados} usados "
+            f"({m.taxa_acerto_prefetch:.0%}), {m.prefetch_desperdicados} desperdiçados, "
+            f"{self.cancelados} cancelados"
+        )
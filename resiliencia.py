@@ -0,0 +1,259 @@
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Callable, Deque, Dict, Optional
+
+# Conexões resilientes ao banco: timeouts curtos, nova tentativa com espera
+# exponencial (com jitter) para erros transitórios e um disjuntor por banco,
+# compartilhado por todas as sessões do processo. Com o disjuntor aberto as
+# chamadas falham na hora (BancoIndisponivel) em vez de esperar o timeout, e o
+# app exibe os últimos dados do cache.
+#
+# Variáveis (segundos): CAZAR_TIMEOUT_CONEXAO, CAZAR_TIMEOUT_CONSULTA,
+# CAZAR_TENTATIVAS, CAZAR_DISJUNTOR_FALHAS, CAZAR_DISJUNTOR_ESPERA.
+
+FECHADO = "fechado"
+ABERTO = "aberto"
+MEIO_ABERTO = "meio-aberto"
+
+# SQLSTATEs de conexão perdida/recusada e de timeout
+SQLSTATES_TRANSITORIOS = {"08001", "08S01", "08004", "HYT00", "HYT01"}
+# Erros do Azure SQL que pedem nova tentativa (banco reiniciando, failover,
+# limite de recursos). Aparecem no texto da mensagem: "... (40613)"
+CODIGOS_TRANSITORIOS_AZURE = {
+    "40613", "40197", "40501", "49918", "49919", "49920", "10928", "10929", "4221"
+}
+
+class BancoIndisponivel(Exception):
+    pass
+
+def transitorio(erro: BaseException) -> bool:
+    if isinstance(erro, BancoIndisponivel):
+        return False
+    if isinstance(erro, sqlite3.OperationalError):
+        texto = str(erro)
+        return "locked" in texto or "busy" in texto
+    # pyodbc: args = (sqlstate, mensagem)
+    args = getattr(erro, "args", ())
+    if args and args[0] in SQLSTATES_TRANSITORIOS:
+        return True
+    texto = str(erro)
+    return any(f"({codigo})" in texto for codigo in CODIGOS_TRANSITORIOS_AZURE)
+
+def _ambiente(nome: str, padrao):
+    valor = os.getenv(nome)
+    return type(padrao)(valor) if valor else padrao
+
+@dataclass
+class Politica:
+    timeout_conexao: int = 5     # login (pyodbc.connect)
+    timeout_consulta: int = 15   # cada instrução (conn.timeout)
+    tentativas: int = 3
+    espera_base: float = 0.2
+    espera_maxima: float = 2.0
+    falhas_para_abrir: int = 5   # falhas transitórias seguidas
+    espera_disjuntor: float = 30.0  # aberto -> meio-aberto
+
+    @classmethod
+    def do_ambiente(cls) -> "Politica":
+        return cls(
+            timeout_conexao=_ambiente("CAZAR_TIMEOUT_CONEXAO", cls.timeout_conexao),
+            timeout_consulta=_ambiente("CAZAR_TIMEOUT_CONSULTA", cls.timeout_consulta),
+            # Ao menos uma tentativa: com 0 conectar() não teria o que devolver
+            tentativas=max(1, _ambiente("CAZAR_TENTATIVAS", cls.tentativas)),
+            falhas_para_abrir=_ambiente("CAZAR_DISJUNTOR_FALHAS", cls.falhas_para_abrir),
+            espera_disjuntor=_ambiente("CAZAR_DISJUNTOR_ESPERA", cls.espera_disjuntor),
+        )
+
+def _percentil(valores, p: float) -> float:
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(p * len(ordenados)))]
+
+@dataclass
+class MetricasConexao:
+    conexoes: int = 0
+    retentativas: int = 0
+    falhas_transitorias: int = 0
+    falhas_permanentes: int = 0
+    rejeitadas: int = 0  # falharam na hora com o disjuntor aberto
+    aberturas: int = 0
+    # Últimas latências em ms: abrir a conexão e usá-la (bloco with)
+    latencias_conexao: Deque[float] = field(default_factory=lambda: deque(maxlen=1000))
+    latencias_uso: Deque[float] = field(default_factory=lambda: deque(maxlen=1000))
+
+class _ConexaoMonitorada:
+    # Repassa tudo para a conexão real; na saída do bloco with informa o
+    # resultado ao disjuntor (timeouts de consulta também contam)
+    __slots__ = ("_conn", "_resiliencia", "_inicio")
+
+    def __init__(self, conn, resiliencia: "Resiliencia"):
+        self._conn = conn
+        self._resiliencia = resiliencia
+        self._inicio = time.perf_counter()
+
+    def __getattr__(self, nome):
+        return getattr(self._conn, nome)
+
+    def __enter__(self):
+        self._conn.__enter__()
+        self._inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, tipo, erro, rastro):
+        self._resiliencia._liberada(erro, time.perf_counter() - self._inicio)
+        return self._conn.__exit__(tipo, erro, rastro)
+
+class Resiliencia:
+    def __init__(self, politica: Optional[Politica] = None,
+                 relogio: Callable[[], float] = time.monotonic,
+                 dormir: Callable[[float], None] = time.sleep,
+                 aleatorio: Callable[[], float] = random.random):
+        self.politica = politica or Politica()
+        self.metricas = MetricasConexao()
+        self._relogio = relogio
+        self._dormir = dormir
+        self._aleatorio = aleatorio
+        self._lock = threading.Lock()
+        self._estado = FECHADO
+        self._falhas_seguidas = 0
+        self._aberto_em = 0.0
+        self._sondando = False  # meio-aberto: uma chamada de teste por vez
+
+    @property
+    def estado(self) -> str:
+        with self._lock:
+            if self._estado == ABERTO and self._pode_sondar():
+                return MEIO_ABERTO
+            return self._estado
+
+    def _pode_sondar(self) -> bool:
+        return self._relogio() - self._aberto_em >= self.politica.espera_disjuntor
+
+    def _permitir(self) -> bool:
+        with self._lock:
+            if self._estado == FECHADO:
+                return True
+            if self._estado == ABERTO and self._pode_sondar():
+                self._estado = MEIO_ABERTO
+                logging.info("Disjuntor do banco meio-aberto: testando a conexão")
+            if self._estado == MEIO_ABERTO and not self._sondando:
+                self._sondando = True
+                return True
+            self.metricas.rejeitadas += 1
+            return False
+
+    def _registrar_sucesso(self):
+        with self._lock:
+            self._falhas_seguidas = 0
+            self._sondando = False
+            if self._estado != FECHADO:
+                self._estado = FECHADO
+                logging.info("Disjuntor do banco fechado: conexão restabelecida")
+
+    def _registrar_falha(self, erro: BaseException) -> bool:
+        # Devolve se o disjuntor está aberto depois desta falha
+        with self._lock:
+            self.metricas.falhas_transitorias += 1
+            self._falhas_seguidas += 1
+            self._sondando = False
+            if self._estado == MEIO_ABERTO or (
+                self._estado == FECHADO
+                and self._falhas_seguidas >= self.politica.falhas_para_abrir
+            ):
+                self._estado = ABERTO
+                self._aberto_em = self._relogio()
+                self.metricas.aberturas += 1
+                logging.warning(f"Disjuntor do banco aberto após {self._falhas_seguidas} "
+                                f"falha(s) seguida(s): {erro}")
+            return self._estado == ABERTO
+
+    def _espera(self, tentativa: int) -> float:
+        # Full jitter: sessões que falharam juntas não tentam de novo juntas
+        limite = min(self.politica.espera_maxima, self.politica.espera_base * 2 ** tentativa)
+        return self._aleatorio() * limite
+
+    def conectar(self, conectar: Callable[[], object], tentativas: Optional[int] = None):
+        tentativas = tentativas or self.politica.tentativas
+        for tentativa in range(tentativas):
+            if not self._permitir():
+                raise BancoIndisponivel("Banco de dados indisponível (disjuntor aberto)")
+            inicio = time.perf_counter()
+            try:
+                conn = conectar()
+            except Exception as e:
+                if not transitorio(e):
+                    with self._lock:
+                        self.metricas.falhas_permanentes += 1
+                        self._sondando = False
+                    raise
+                aberto = self._registrar_falha(e)
+                if tentativa + 1 == tentativas or aberto:
+                    raise
+                with self._lock:
+                    self.metricas.retentativas += 1
+                self._dormir(self._espera(tentativa))
+                continue
+            with self._lock:
+                self.metricas.conexoes += 1
+                self.metricas.latencias_conexao.append((time.perf_counter() - inicio) * 1000)
+            return _ConexaoMonitorada(conn, self)
+
+    def executar_leitura(self, conectar: Callable[[], object], ler: Callable[[object], object]):
+        # Só para consultas de leitura, que podem ser repetidas inteiras: um
+        # erro transitório no meio da instrução (link caído, timeout,
+        # failover) ganha a mesma espera e o mesmo limite de tentativas da
+        # conexão. Escritas não passam por aqui: o commit pode ter chegado ao
+        # banco antes do erro, e repetir duplicaria a linha.
+        for tentativa in range(self.politica.tentativas):
+            try:
+                with self.conectar(conectar, tentativas=1) as conn:
+                    return ler(conn)
+            except Exception as e:
+                if not transitorio(e) or tentativa + 1 == self.politica.tentativas:
+                    raise
+                with self._lock:
+                    if self._estado == ABERTO:
+                        raise
+                    self.metricas.retentativas += 1
+                self._dormir(self._espera(tentativa))
+
+    def _liberada(self, erro: Optional[BaseException], segundos: float):
+        with self._lock:
+            self.metricas.latencias_uso.append(segundos * 1000)
+        if erro is None:
+            self._registrar_sucesso()
+        elif transitorio(erro):
+            self._registrar_falha(erro)
+        else:
+            # Erro da consulta (constraint, sintaxe...): o banco respondeu
+            self._registrar_sucesso()
+
+    def resumo(self) -> str:
+        m = self.metricas
+        with self._lock:
+            conexao = list(m.latencias_conexao)
+            uso = list(m.latencias_uso)
+        return (
+            f"Banco {self.estado}: {m.conexoes} conexões, {m.retentativas} retentativas, "
+            f"{m.falhas_transitorias} falhas transitórias, {m.rejeitadas} rejeitadas, "
+            f"{m.aberturas} aberturas; conexão p50 {_percentil(conexao, 0.5):.0f} ms / "
+            f"p95 {_percentil(conexao, 0.95):.0f} ms, uso p50 {_percentil(uso, 0.5):.0f} ms / "
+            f"p95 {_percentil(uso, 0.95):.0f} ms"
+        )
+
+_resiliencias: Dict[str, Resiliencia] = {}
+_resiliencias_lock = threading.Lock()
+
+def obter_resiliencia(chave: str) -> Resiliencia:
+    # Uma por banco (string de conexão ou arquivo), compartilhada pelas sessões
+    with _resiliencias_lock:
+        if chave not in _resiliencias:
+            _resiliencias[chave] = Resiliencia(Politica.do_ambiente())
+        return _resiliencias[chave]
@@ -0,0 +1,207 @@
+"""Teste de carga do app Streamlit com sessões simultâneas.
+
+Cada sessão simulada usa o ``AppTest`` do Streamlit para percorrer as páginas
+reais do CAZAR.py (cadastro de demanda, orçamentos e relatório financeiro)
+contra o substituto local em SQLite. As sessões começam juntas e disputam o
+mesmo arquivo de banco; latências de rerun, vazão, conexões abertas e memória
+por sessão são reportadas para cada quantidade de sessões.
+
+Uso:
+    python teste_carga.py --sessoes 1,4,8,16 --iteracoes 5
+"""
+import argparse
+import multiprocessing
+import os
+import statistics
+import tempfile
+import time
+import tracemalloc
+from dataclasses import dataclass, field
+from types import SimpleNamespace
+from typing import List
+
+from streamlit.testing.v1 import AppTest
+
+import database
+
+APP = os.path.join(os.path.dirname(os.path.abspath(__file__)), "CAZAR.py")
+
+@dataclass
+class Metricas:
+    latencias: List[float] = field(default_factory=list)
+    erros: int = 0
+
+class ContadorConexoes:
+    # Conta as conexões abertas e os Database criados durante a rodada
+    def __init__(self):
+        self.conexoes = 0
+        self.instancias = 0
+        self._get_connection = database.DatabaseLocal.get_connection
+        self._init = database.DatabaseLocal.__init__
+
+    def __enter__(self):
+        contador = self
+
+        def get_connection(db):
+            contador.conexoes += 1
+            return contador._get_connection(db)
+
+        def init(db, *args, **kwargs):
+            contador.instancias += 1
+            contador._init(db, *args, **kwargs)
+
+        database.DatabaseLocal.get_connection = get_connection
+        database.DatabaseLocal.__init__ = init
+        return self
+
+    def __exit__(self, *exc):
+        database.DatabaseLocal.get_connection = self._get_connection
+        database.DatabaseLocal.__init__ = self._init
+
+def _widget(colecao, label):
+    for widget in colecao:
+        if widget.label == label:
+            return widget
+    raise LookupError(f"Widget não encontrado: {label}")
+
+def _executar(at, metricas: Metricas):
+    inicio = time.perf_counter()
+    at.run()
+    metricas.latencias.append(time.perf_counter() - inicio)
+    if at.exception:
+        metricas.erros += 1
+
+def _ir_para(at, pagina, metricas):
+    _widget(at.sidebar.selectbox, "Selecione uma opção").select(pagina)
+    _executar(at, metricas)
+
+def simular_sessao(numero: int, iteracoes: int, metricas: Metricas, timeout: float):
+    at = AppTest.from_file(APP, default_timeout=timeout)
+    _executar(at, metricas)
+
+    for i in range(iteracoes):
+        # Cadastro de demanda
+        _ir_para(at, "Demandas", metricas)
+        _widget(at.text_input, "Nome da Demanda").input(f"Sessão {numero} - demanda {i}")
+        _widget(at.text_area, "Descrição").input("Gerada pelo teste de carga")
+        _widget(at.text_input, "Valor (R$)").input("1.500,00")
+        _widget(at.button, "Adicionar Demanda").click()
+        _executar(at, metricas)
+
+        # Navegação e cadastro de orçamento
+        _ir_para(at, "Orçamentos", metricas)
+        selecao = _widget(at.selectbox, "Selecione a demanda")
+        if selecao.options:
+            # O selectbox usa format_func=lambda x: x.nome; o AppTest aplica a
+            # mesma função ao valor escolhido, então passamos algo com .nome
+            selecao.set_value(SimpleNamespace(nome=selecao.options[i % len(selecao.options)]))
+            _executar(at, metricas)
+        _widget(at.text_input, "Fornecedor").input(f"Fornecedor {numero}")
+        _widget(at.text_area, "Descrição do Orçamento").input("Orçamento de teste")
+        _widget(at.text_input, "Valor (R$)").input(f"{100 * (i + 1)},00")
+        _widget(at.button, "Adicionar Orçamento").click()
+        _executar(at, metricas)
+
+        # Relatório financeiro
+        _ir_para(at, "Relatório Financeiro", metricas)
+
+    return at
+
+def _percentil(valores, p):
+    if len(valores) == 1:
+        return valores[0]
+    return statistics.quantiles(valores, n=100, method="inclusive")[p - 1]
+
+def _trabalhador(numero, iteracoes, timeout, barreira, fila):
+    # Cada sessão roda em um processo próprio: o AppTest guarda estado global
+    # (Runtime._instance) e não suporta execuções simultâneas no mesmo processo
+    metricas = Metricas()
+    with ContadorConexoes() as contador:
+        barreira.wait()
+        tracemalloc.start()
+        inicio = time.time()
+        try:
+            at = simular_sessao(numero, iteracoes, metricas, timeout)
+        except Exception as e:
+            metricas.erros += 1
+            print(f"Sessão {numero} falhou: {e}")
+            at = None
+        fim = time.time()
+        memoria = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del at
+
+    fila.put({
+        "latencias": metricas.latencias,
+        "erros": metricas.erros,
+        "inicio": inicio,
+        "fim": fim,
+        "conexoes": contador.conexoes,
+        "databases": contador.instancias,
+        "memoria": memoria,
+    })
+
+def rodada(sessoes: int, iteracoes: int, timeout: float) -> dict:
+    ctx = multiprocessing.get_context("spawn")
+    barreira = ctx.Barrier(sessoes)
+    fila = ctx.Queue()
+    processos = [
+        ctx.Process(target=_trabalhador, args=(n, iteracoes, timeout, barreira, fila))
+        for n in range(sessoes)
+    ]
+    for p in processos:
+        p.start()
+    parciais = [fila.get() for _ in processos]
+    for p in processos:
+        p.join()
+
+    latencias = sorted(l for r in parciais for l in r["latencias"])
+    duracao = max(r["fim"] for r in parciais) - min(r["inicio"] for r in parciais)
+    return {
+        "sessoes": sessoes,
+        "reruns": len(latencias),
+        "erros": sum(r["erros"] for r in parciais),
+        "p50_ms": _percentil(latencias, 50) * 1000,
+        "p95_ms": _percentil(latencias, 95) * 1000,
+        "p99_ms": _percentil(latencias, 99) * 1000,
+        "max_ms": latencias[-1] * 1000,
+        "reruns_s": len(latencias) / duracao,
+        "conexoes": sum(r["conexoes"] for r in parciais),
+        "databases": sum(r["databases"] for r in parciais),
+        "memoria_sessao_kb": sum(r["memoria"] for r in parciais) / sessoes / 1024,
+    }
+
+def imprimir(resultados):
+    colunas = [
+        ("sessoes", "{:>7}"), ("reruns", "{:>7}"), ("erros", "{:>6}"),
+        ("p50_ms", "{:>8.1f}"), ("p95_ms", "{:>8.1f}"), ("p99_ms", "{:>8.1f}"),
+        ("max_ms", "{:>8.1f}"), ("reruns_s", "{:>9.1f}"), ("conexoes", "{:>9}"),
+        ("databases", "{:>9}"), ("memoria_sessao_kb", "{:>18.0f}"),
+    ]
+    print(" ".join(f"{nome:>{len(fmt.format(0))}}" for nome, fmt in colunas))
+    for r in resultados:
+        print(" ".join(fmt.format(r[nome]) for nome, fmt in colunas))
+
+def main():
+    parser = argparse.ArgumentParser(description="Teste de carga do Gestor de Casamento")
+    parser.add_argument("--sessoes", default="1,4,8,16",
+                        help="Lista de quantidades de sessões simultâneas")
+    parser.add_argument("--iteracoes", type=int, default=3,
+                        help="Ciclos demanda/orçamento/relatório por sessão")
+    parser.add_argument("--banco", help="Arquivo SQLite (padrão: temporário)")
+    parser.add_argument("--timeout", type=float, default=60,
+                        help="Timeout de cada rerun em segundos")
+    args = parser.parse_args()
+
+    banco = args.banco or os.path.join(tempfile.mkdtemp(), "carga.db")
+    os.environ["CAZAR_SQLITE"] = banco
+    print(f"Banco: {banco}")
+
+    resultados = [
+        rodada(int(n), args.iteracoes, args.timeout)
+        for n in args.sessoes.split(",")
+    ]
+    imprimir(resultados)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+from backup import Backup
+from database import DatabaseLocal
+from dinheiro import Dinheiro
+
+def _banco(tmp_path, nome="origem.db"):
+    db = DatabaseLocal(str(tmp_path / nome))
+    for i in range(25):
+        db.inserir_demanda(f"Demanda {i}", "", "Média", Dinheiro(1000 * i))
+    db.inserir_orcamento(3, "Buffet Sabor", "Jantar", Dinheiro.de_texto("30.000,00"))
+    db.inserir_orcamento(3, "Buffet Arte", "Jantar", Dinheiro.de_texto("28.500,00"))
+    db.inserir_gasto("Sinal do salão", Dinheiro.de_texto("5.000,00"))
+    return db
+
+def test_incremental_le_apenas_blocos_alterados(tmp_path):
+    db = _banco(tmp_path)
+    backup = Backup(db, str(tmp_path / "backups"), tamanho_bloco=10)
+
+    primeiro = backup.fazer()
+    assert primeiro.blocos_lidos == 5  # 3 de Demandas, 1 de Orcamentos, 1 de Gastos
+    assert backup.fazer().blocos_lidos == 0
+
+    db.atualizar_demanda(12, "Demanda alterada", "", "Alta", "Concluída")
+    segundo = backup.fazer()
+    assert segundo.blocos_lidos == 1
+    assert segundo.linhas_lidas == 10
+
+def test_restaura_ponto_no_tempo(tmp_path):
+    db = _banco(tmp_path)
+    backup = Backup(db, str(tmp_path / "backups"), tamanho_bloco=10)
+    backup.fazer()
+    inicial = backup.manifestos()[-1]
+    db.excluir_demanda(3)
+    db.inserir_gasto("Fotógrafo", Dinheiro.de_texto("4.200,00"))
+    backup.fazer()
+
+    destino = DatabaseLocal(str(tmp_path / "destino.db"))
+    assert backup.restaurar(destino, inicial) == 25 + 2 + 1
+    assert sorted(d.nome for d in destino.obter_demandas()) == sorted(
+        f"Demanda {i}" for i in range(25)
+    )
+    assert destino.obter_resumo_orcamentos(3).valor_minimo == Dinheiro.de_texto("28.500,00")
+    assert destino.obter_total_gastos() == Dinheiro.de_texto("5.000,00")
+    assert destino.verificar_resumos(reconstruir=False) == []
+
+    assert backup.restaurar(destino) == 24 + 2
+    assert len(destino.obter_demandas()) == 24
+
+def test_backup_e_um_instante_mesmo_com_escritas_concorrentes(tmp_path):
+    db = _banco(tmp_path)
+    backup = Backup(db, str(tmp_path / "backups"), tamanho_bloco=10)
+    somas_por_bloco = db.somas_por_bloco
+
+    def escrever_durante_o_backup(cursor, tabela, tamanho):
+        # Outra sessão grava uma demanda e um orçamento dela enquanto o backup
+        # já leu Demandas e ainda vai ler Orcamentos
+        if tabela == "Orcamentos":
+            assert db.inserir_demanda("Doces", "", "Média")
+            assert db.inserir_orcamento(26, "Doceria", "Bem-casados", Dinheiro.de_texto("900,00"))
+        return somas_por_bloco(cursor, tabela, tamanho)
+
+    db.somas_por_bloco = escrever_durante_o_backup
+    backup.fazer()
+    del db.somas_por_bloco
+
+    destino = DatabaseLocal(str(tmp_path / "destino.db"))
+    assert backup.restaurar(destino) == 25 + 2 + 1
+    assert backup.fazer().blocos_lidos == 2
+    assert backup.restaurar(destino) == 26 + 3 + 1
+    assert destino.obter_resumo_orcamentos(26).valor_total == Dinheiro.de_texto("900,00")
+
+def test_restaura_valor_nulo(tmp_path):
+    db = _banco(tmp_path)
+    with db.get_connection() as conn:
+        conn.execute("INSERT INTO Gastos (descricao, valor) VALUES ('Sem valor', NULL)")
+        conn.commit()
+    backup = Backup(db, str(tmp_path / "backups"))
+    backup.fazer()
+
+    destino = DatabaseLocal(str(tmp_path / "destino.db"))
+    assert backup.restaurar(destino) == 25 + 2 + 2
+    with destino.get_connection() as conn:
+        assert conn.execute(
+            "SELECT valor FROM Gastos WHERE descricao = 'Sem valor'"
+        ).fetchone() == (None,)
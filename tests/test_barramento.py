@@ -0,0 +1,57 @@
+import time
+
+from barramento import BarramentoMudancas, Mudanca, TransporteArquivo
+from cache import CacheConsultas
+
+def test_publicar_entrega_para_assinantes_da_tabela():
+    barramento = BarramentoMudancas()
+    recebidas = []
+    barramento.assinar(recebidas.append, tabelas=["Demandas"])
+
+    barramento.publicar("Demandas", 1, "inserir")
+    barramento.publicar("Gastos", 2, "inserir")
+
+    assert [(m.tabela, m.id, m.operacao) for m in recebidas] == [("Demandas", 1, "inserir")]
+
+def test_assinatura_de_metodo_morre_com_o_objeto():
+    barramento = BarramentoMudancas()
+    cache = CacheConsultas()
+    barramento.assinar(cache.invalidar)
+    del cache
+
+    barramento.publicar("Demandas", 1, "inserir")
+    assert barramento.total_assinaturas == 0
+
+def test_cache_invalida_apenas_o_que_mudou():
+    cache = CacheConsultas()
+    cache.obter("demandas", lambda: ["a"], [("Demandas", None)])
+    cache.obter(("resumo", 1), lambda: "r1", [("ResumoOrcamentos", 1)])
+    cache.obter(("resumo", 2), lambda: "r2", [("ResumoOrcamentos", 2)])
+
+    cache.invalidar(Mudanca("ResumoOrcamentos", 1, "atualizar"))
+
+    assert cache.obter(("resumo", 1), lambda: "novo", []) == "novo"
+    assert cache.obter(("resumo", 2), lambda: "novo", []) == "r2"
+    assert cache.obter("demandas", lambda: ["novo"], []) == ["a"]
+    assert cache.consumir_alteracao("ResumoOrcamentos")
+    assert not cache.consumir_alteracao("ResumoOrcamentos")
+
+def test_transporte_arquivo_entre_processos(tmp_path):
+    caminho = str(tmp_path / "mudancas.log")
+    processo_a, processo_b = BarramentoMudancas(), BarramentoMudancas()
+    processo_a.transporte = TransporteArquivo(processo_a, caminho, intervalo=0.01)
+    processo_b.transporte = TransporteArquivo(processo_b, caminho, intervalo=0.01)
+    recebidas_a, recebidas_b = [], []
+    processo_a.assinar(recebidas_a.append)
+    processo_b.assinar(recebidas_b.append)
+
+    processo_a.publicar("Orcamentos", 7, "inserir")
+    limite = time.time() + 2
+    while not recebidas_b and time.time() < limite:
+        time.sleep(0.01)
+    processo_a.transporte.parar()
+    processo_b.transporte.parar()
+
+    assert [(m.tabela, m.id) for m in recebidas_b] == [("Orcamentos", 7)]
+    # O próprio processo não recebe sua mudança de volta pelo arquivo
+    assert len(recebidas_a) == 1
@@ -0,0 +1,70 @@
+from barramento import Mudanca
+from cache import CacheConsultas
+from fornecedores import IndiceFornecedores
+
+def test_descarta_carga_concorrente_com_invalidacao():
+    cache = CacheConsultas()
+
+    def carregar():
+        # Outra sessão grava enquanto a consulta ainda está em andamento
+        cache.invalidar(Mudanca("Gastos", 3, "inserir"))
+        return ["lido antes da escrita"]
+
+    assert cache.obter("gastos", carregar, [("Gastos", None)]) == ["lido antes da escrita"]
+    assert cache.obter("gastos", lambda: ["atual"], [("Gastos", None)]) == ["atual"]
+    assert cache.obter("gastos", lambda: ["não recarrega"], []) == ["atual"]
+
+def test_guarda_resultado_vazio_mas_nao_falha():
+    cache = CacheConsultas()
+    cargas = []
+
+    def sem_gastos():
+        cargas.append(1)
+        return []
+
+    assert cache.obter("gastos", sem_gastos, [("Gastos", None)]) == []
+    assert cache.obter("gastos", sem_gastos, [("Gastos", None)]) == []
+    assert len(cargas) == 1
+
+    # None: a consulta falhou e deve ser refeita na próxima leitura
+    assert cache.obter("demandas", lambda: None, [("Demandas", None)]) is None
+    assert cache.obter("demandas", lambda: ["d1"], [("Demandas", None)]) == ["d1"]
+
+def test_cache_limitado_e_descarta_carga_desatualizada():
+    cache = CacheConsultas(max_entradas=2)
+    versao = cache.versao
+    cache.guardar("a", [1], [("Demandas", None)], versao, prefetch=True)
+    cache.guardar("b", [2], [("Gastos", None)], versao)
+    cache.guardar("c", [3], [("Gastos", None)], versao)
+
+    # "a" foi expulsa sem ser lida: prefetch desperdiçado
+    assert not cache.contem("a")
+    assert cache.metricas.prefetch_desperdicados == 1
+
+    versao = cache.versao
+    cache.invalidar(Mudanca("Orcamentos", 1, "inserir"))
+    assert not cache.guardar("d", [4], [("Demandas", None)], versao)
+
+def test_cache_guarda_reserva_do_valor_invalidado():
+    cache = CacheConsultas()
+    cache.obter("gastos", lambda: ["g1"], [("Gastos", None)])
+    cache.invalidar(Mudanca("Gastos", 2, "inserir"))
+
+    # Recarga falhou (banco fora do ar): a reserva continua disponível
+    assert cache.obter("gastos", lambda: None, []) is None
+    assert cache.obter_reserva("gastos") == ["g1"]
+    assert cache.metricas.reservas_servidas == 1
+
+    cache.obter("gastos", lambda: ["g1", "g2"], [("Gastos", None)])
+    assert cache.obter_reserva("gastos") is None
+
+def test_indice_e_consulta_grande_nao_se_expulsam():
+    cache = CacheConsultas(max_linhas=10)
+    indice = IndiceFornecedores({f"Fornecedor {i}": 1 for i in range(60)})
+    cache.guardar("demandas", [1, 2, 3], [("Demandas", None)], cache.versao)
+    assert cache.guardar("fornecedores", indice, [("Orcamentos", None)], cache.versao)
+    assert cache.contem("demandas")
+
+    # Uma consulta acima do limite expulsa as outras, mas fica guardada
+    assert cache.guardar("gastos", list(range(20)), [("Gastos", None)], cache.versao)
+    assert not cache.contem("demandas") and not cache.contem("fornecedores")
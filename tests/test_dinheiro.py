@@ -0,0 +1,55 @@
+import random
+from decimal import Decimal
+
+import pytest
+
+from dinheiro import Dinheiro, formatar_lote, parsear_lote
+
+@pytest.mark.parametrize("texto, centavos", [
+    ("R$ 1.500,00", 150000),
+    ("1500", 150000),
+    ("1.500,5", 150050),
+    ("0,07", 7),
+    (",50", 50),
+    ("-R$ 20,00", -2000),
+    ("R$ -20", -2000),
+    ("  R$1.234.567,89 ", 123456789),
+])
+def test_de_texto(texto, centavos):
+    assert Dinheiro.de_texto(texto).centavos == centavos
+
+@pytest.mark.parametrize("texto", ["", "R$", "abc", "1,234", "1.5e3", "1,2,3", "١٢"])
+def test_de_texto_rejeita_formato_invalido(texto):
+    with pytest.raises(ValueError):
+        Dinheiro.de_texto(texto)
+
+def test_formatacao_e_lote():
+    assert str(Dinheiro(150000)) == "R$ 1.500,00"
+    assert f"{Dinheiro(-5)}" == "R$ -0,05"
+    assert f"{Dinheiro(123456789):,.2f}" == "1,234,567.89"
+    assert list(parsear_lote(["1,00", "R$ 2.000,10"])) == [100, 200010]
+    assert formatar_lote([100, 200010]) == ["R$ 1,00", "R$ 2.000,10"]
+
+def test_formatacao_exata_em_toda_a_faixa_int64():
+    aleatorio = random.Random(3)
+    valores = [8511090284023826, 2**63 - 1, -(2**63), 0, 99, -100] + [
+        aleatorio.randrange(10**14, 2**63) * aleatorio.choice((1, -1)) for _ in range(2000)
+    ]
+    esperados = [
+        f"R$ {Decimal(c).scaleb(-2):,.2f}".replace(",", "_").replace(".", ",").replace("_", ".")
+        for c in valores
+    ]
+    assert [str(Dinheiro(c)) for c in valores] == esperados
+    assert formatar_lote(valores) == esperados
+    assert str(Dinheiro(8511090284023826)) == "R$ 85.110.902.840.238,26"
+
+def test_aritmetica_exata():
+    valores = [Dinheiro.de_texto("0,10")] * 3
+    assert sum(valores) == Dinheiro(30)
+    assert Dinheiro(1000) - Dinheiro(1) == Dinheiro(999)
+    assert Dinheiro(1000) / 3 == Dinheiro(333)
+    assert Dinheiro(1001) / 2 == Dinheiro(501)
+    assert Dinheiro.de_reais(Decimal("10.005")) == Dinheiro(1001)
+    assert Dinheiro.de_reais(Decimal("10.5")).em_reais() == Decimal("10.50")
+    with pytest.raises(TypeError):
+        Dinheiro.de_reais(10.5)
@@ -0,0 +1,61 @@
+import random
+from itertools import combinations
+
+from fornecedores import IndiceFornecedores, duplicados, normalizar
+
+def test_normalizar_ignora_acentos_caixa_e_sufixos():
+    assert normalizar("Buffét Sabor LTDA.") == "buffet sabor"
+    assert normalizar("buffet sabor ltda") == "buffet sabor"
+    assert normalizar("Foto Clic S/A") == "foto clic"
+    assert normalizar("ME") == "me"
+
+def test_sugerir_encontra_nome_com_erro_de_digitacao():
+    indice = IndiceFornecedores({
+        "Buffet Sabor": 3,
+        "buffet sabor ltda": 1,
+        "Floricultura Rosa": 2,
+        "Foto Clic": 1,
+    })
+
+    assert indice.sugerir("bufet sab") == ["Buffet Sabor"]
+    assert indice.sugerir("flor") == ["Floricultura Rosa"]
+    assert indice.sugerir("xyz") == []
+
+def test_agrupar_une_grafias_do_mesmo_fornecedor():
+    indice = IndiceFornecedores({
+        "Buffet Sabor": 5,
+        "bufet sabor": 1,
+        "Buffet Sabor LTDA": 2,
+        "Doces da Ana": 4,
+        "Doces da Ana Maria": 1,
+        "Floricultura Rosa": 2,
+    })
+
+    grupos = {g.canonico: set(g.variantes) for g in duplicados(indice.agrupar())}
+
+    assert grupos == {
+        "Buffet Sabor": {"Buffet Sabor", "bufet sabor", "Buffet Sabor LTDA"},
+        "Doces da Ana": {"Doces da Ana", "Doces da Ana Maria"},
+    }
+
+def test_agrupar_encontra_os_mesmos_pares_que_a_comparacao_completa():
+    # Nomes curtos e com erros de digitação exercitam os limites dos prefixos
+    aleatorio = random.Random(7)
+    palavras = ["ana", "bia", "buffet", "doces", "flor", "foto", "sabor", "silva", "som", "luz"]
+    contagens = {}
+    for _ in range(400):
+        nome = " ".join(aleatorio.sample(palavras, aleatorio.randint(1, 3)))
+        if aleatorio.random() < 0.5:
+            k = aleatorio.randrange(len(nome))
+            nome = nome[:k] + nome[k + 1:]
+        contagens[nome] = aleatorio.randint(1, 5)
+    indice = IndiceFornecedores(contagens)
+
+    for minimo in (0.5, 0.6, 0.8):
+        esperado = [set() for _ in indice.normalizados]
+        for x, y in combinations(range(len(indice)), 2):
+            a, b = indice._trigramas[x], indice._trigramas[y]
+            if len(a & b) / len(a | b) >= minimo:
+                esperado[x].add(y)
+                esperado[y].add(x)
+        assert [set(v) for v in indice._pares(minimo)] == esperado
@@ -0,0 +1,57 @@
+import database
+from database import DatabaseLocal
+from dinheiro import Dinheiro
+
+def _banco(tmp_path, quantidade=6):
+    db = DatabaseLocal(str(tmp_path / "cazar.db"))
+    for i in range(1, quantidade + 1):
+        db.inserir_demanda(f"Demanda {i}", "", "Alta" if i % 2 else "Baixa")
+        db.inserir_orcamento(i, "Fornecedor", "", Dinheiro(100 * i))
+    return db
+
+def _status(db):
+    return {d.id: d.status for d in db.obter_demandas()}
+
+def test_deletar_por_ids(tmp_path):
+    db = _banco(tmp_path)
+    resultado = db.deletar_demandas(ids=[2, 4, 4, 99])
+    assert (resultado.demandas, resultado.orcamentos) == (2, 2)
+    assert sorted(_status(db)) == [1, 3, 5, 6]
+
+def test_deletar_por_filtro_e_ids_com_filtro(tmp_path):
+    db = _banco(tmp_path)
+    assert db.atualizar_demandas(ids=[1, 2], status="Concluído") == 2
+
+    resultado = db.deletar_demandas(ids=[1, 2, 3], filtro={"status": "Concluído", "prioridade": "Alta"})
+    assert (resultado.demandas, resultado.orcamentos) == (1, 1)
+
+    resultado = db.deletar_demandas(filtro={"prioridade": ["Baixa"]})
+    assert (resultado.demandas, resultado.orcamentos) == (3, 3)
+    assert sorted(_status(db)) == [3, 5]
+    assert db.verificar_resumos(reconstruir=False) == []
+
+def test_atualizar_por_filtro(tmp_path):
+    db = _banco(tmp_path)
+    assert db.atualizar_demandas(filtro={"prioridade": "Alta"}, status="Em Andamento") == 3
+    assert db.atualizar_demandas(ids=[1, 2], filtro={"status": "Pendente"}, prioridade="Média") == 1
+    assert _status(db) == {
+        1: "Em Andamento", 2: "Pendente", 3: "Em Andamento",
+        4: "Pendente", 5: "Em Andamento", 6: "Pendente",
+    }
+
+def test_lista_vazia_no_filtro_nao_afeta_nada(tmp_path):
+    db = _banco(tmp_path)
+    resultado = db.deletar_demandas(filtro={"status": []})
+    assert (resultado.demandas, resultado.orcamentos) == (0, 0)
+    assert db.atualizar_demandas(filtro={"status": []}, status="Concluído") == 0
+    assert len(_status(db)) == 6
+
+def test_ids_acima_do_tamanho_do_lote(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "TAMANHO_LOTE", 2)
+    db = _banco(tmp_path, quantidade=7)
+    assert db.atualizar_demandas(ids=range(1, 8), status="Concluído") == 7
+    assert set(_status(db).values()) == {"Concluído"}
+
+    resultado = db.deletar_demandas(ids=[1, 2, 3, 4, 5])
+    assert (resultado.demandas, resultado.orcamentos) == (5, 5)
+    assert sorted(_status(db)) == [6, 7]
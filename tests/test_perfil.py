@@ -0,0 +1,138 @@
+import os
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import perfil
+from perfil import Perfilador, pilhas_cprofile
+
+@pytest.fixture
+def relogio(monkeypatch):
+    # perf_counter_ns controlado: cada chamada de avancar() soma ms ao relógio
+    estado = SimpleNamespace(ns=0)
+    monkeypatch.setattr(time, "perf_counter_ns", lambda: estado.ns)
+
+    def avancar(ms):
+        estado.ns += ms * 1_000_000
+    return avancar
+
+def _por_caminho(perfilador):
+    return {caminho: (total, proprio) for _, caminho, total, proprio in perfilador.secoes}
+
+def test_secoes_aninhadas_e_tempo_proprio(relogio, tmp_path):
+    perfilador = Perfilador(diretorio=str(tmp_path))
+    perfilador.iniciar()
+    relogio(1)
+    with perfilador.secao("consulta"):
+        relogio(2)
+        with perfilador.secao("sql"):
+            relogio(5)
+        relogio(1)
+    with perfilador.secao("render"):
+        relogio(3)
+    perfilador.finalizar()
+
+    ms = 1_000_000
+    assert _por_caminho(perfilador) == {
+        ("rerun",): (12 * ms, 1 * ms),
+        ("rerun", "consulta"): (8 * ms, 3 * ms),
+        ("rerun", "consulta", "sql"): (5 * ms, 5 * ms),
+        ("rerun", "render"): (3 * ms, 3 * ms),
+    }
+    assert perfilador.total_ms == 12.0
+    # Ordem de abertura preservada para a exibição
+    assert [caminho[-1] for _, caminho, _, _ in sorted(perfilador.secoes)] == [
+        "rerun", "consulta", "sql", "render"
+    ]
+    assert sorted(perfilador.linhas_colapsadas()) == [
+        "rerun 1000", "rerun;consulta 3000", "rerun;consulta;sql 5000", "rerun;render 3000"
+    ]
+
+def test_finalizar_fecha_secoes_abertas(relogio, tmp_path):
+    # st.rerun()/st.stop() saem sem passar pelo __exit__ das seções
+    perfilador = Perfilador(diretorio=str(tmp_path))
+    perfilador.iniciar()
+    perfilador.secao("pagina").__enter__()
+    relogio(2)
+    perfilador.secao("formulario").__enter__()
+    relogio(4)
+    perfilador.finalizar()
+
+    ms = 1_000_000
+    assert _por_caminho(perfilador) == {
+        ("rerun",): (6 * ms, 0),
+        ("rerun", "pagina"): (6 * ms, 2 * ms),
+        ("rerun", "pagina", "formulario"): (4 * ms, 4 * ms),
+    }
+    assert perfilador.total_ms == 6.0
+
+def test_pilhas_cprofile_reparte_tempo_entre_chamadores():
+    # main -> a (3 s), main -> b -> a (3 s); a tem 6 s próprios no total
+    main, a, b = ("~", 0, "main"), ("/app/mod.py", 10, "a"), ("/app/mod.py", 20, "b")
+    stats = SimpleNamespace(stats={
+        main: (1, 1, 1.0, 10.0, {}),
+        b: (1, 1, 3.0, 6.0, {main: (1, 1, 3.0, 6.0)}),
+        a: (2, 2, 6.0, 6.0, {main: (1, 1, 3.0, 3.0), b: (1, 1, 3.0, 3.0)}),
+    })
+
+    pilhas = pilhas_cprofile(stats)
+
+    assert pilhas == pytest.approx({
+        "rerun;main": 1.0,
+        "rerun;main;a (mod.py:10)": 3.0,
+        "rerun;main;b (mod.py:20)": 3.0,
+        "rerun;main;b (mod.py:20);a (mod.py:10)": 3.0,
+    })
+    assert sum(pilhas.values()) == pytest.approx(10.0)
+
+def test_cprofile_ocupado_mede_so_as_secoes(tmp_path):
+    primeiro = Perfilador(cprofile=True, diretorio=str(tmp_path))
+    segundo = Perfilador(cprofile=True, diretorio=str(tmp_path))
+    primeiro.iniciar()
+    try:
+        segundo.iniciar()
+        with segundo.secao("consulta"):
+            pass
+        segundo.finalizar()
+    finally:
+        primeiro.finalizar()
+
+    assert not primeiro.cprofile_ocupado
+    assert segundo.cprofile_ocupado
+    assert [caminho for _, caminho, _, _ in segundo.secoes] == [("rerun", "consulta"), ("rerun",)]
+    segundo.salvar()
+    assert os.listdir(tmp_path) == ["secoes.folded"]
+
+    # Liberado pelo primeiro, o próximo rerun volta a usar o cProfile
+    terceiro = Perfilador(cprofile=True, diretorio=str(tmp_path))
+    terceiro.iniciar()
+    terceiro.finalizar()
+    assert not terceiro.cprofile_ocupado
+
+def test_rerun_limpa_o_perfilador_se_iniciar_falhar(monkeypatch, tmp_path):
+    monkeypatch.setenv("CAZAR_PERFIL", "cprofile")
+    monkeypatch.setenv("CAZAR_PERFIL_DIR", str(tmp_path))
+
+    def falhar(self):
+        raise RuntimeError("falha ao iniciar")
+    monkeypatch.setattr(Perfilador, "iniciar", falhar)
+
+    with pytest.raises(RuntimeError):
+        with perfil.rerun():
+            pass
+    assert perfil.secao("depois") is perfil._NULO
+
+def test_cprofile_recusado_pelo_interpretador(monkeypatch, tmp_path):
+    # Python 3.12+: sys.monitoring já tomado por outra ferramenta
+    class Recusado:
+        def enable(self):
+            raise ValueError("Another profiling tool is already active")
+    monkeypatch.setattr(perfil.cProfile, "Profile", Recusado)
+
+    perfilador = Perfilador(cprofile=True, diretorio=str(tmp_path))
+    perfilador.iniciar()
+    perfilador.finalizar()
+    perfilador.salvar()
+    assert perfilador.cprofile_ocupado
+    assert not perfil._trava_cprofile.locked()
@@ -0,0 +1,106 @@
+import os
+
+import pytest
+
+from dinheiro import Dinheiro
+from persistencia import GestorPersistente
+
+def _popular(gestor):
+    gestor.definir_orcamento_total(Dinheiro.de_texto("30.000,00"))
+    buffet = gestor.criar_demanda("Buffet", "Jantar para 150 pessoas", 5)
+    gestor.criar_demanda("Fotografia", "Cerimônia e festa", 3)
+    gestor.adicionar_orcamento(buffet, "Buffet Sabor", Dinheiro.de_texto("15.000,00"), "Completo")
+    gestor.registrar_gasto("Sinal do buffet", Dinheiro.de_texto("3.000,00"))
+
+def test_restaura_estado_a_partir_do_log(tmp_path):
+    gestor = GestorPersistente(str(tmp_path))
+    _popular(gestor)
+    gestor.fechar()
+
+    restaurado = GestorPersistente(str(tmp_path))
+
+    assert [d.nome for d in restaurado.demandas] == ["Buffet", "Fotografia"]
+    assert restaurado.demandas[0].data_criacao == gestor.demandas[0].data_criacao
+    assert restaurado.demandas[0].orcamentos[0].valor == Dinheiro.de_texto("15.000,00")
+    assert restaurado.controle_financeiro.saldo == Dinheiro.de_texto("27.000,00")
+    assert restaurado.gerar_relatorio_financeiro() == gestor.gerar_relatorio_financeiro()
+
+def test_compactacao_mantem_estado_e_novos_eventos(tmp_path):
+    gestor = GestorPersistente(str(tmp_path))
+    _popular(gestor)
+    gestor.compactar()
+    gestor.registrar_gasto("Fotógrafo", Dinheiro.de_texto("2.000,00"))
+    gestor.fechar()
+
+    restaurado = GestorPersistente(str(tmp_path))
+
+    assert restaurado.geracao == 1
+    assert len(restaurado.demandas) == 2
+    assert restaurado.controle_financeiro.saldo == Dinheiro.de_texto("25.000,00")
+
+def test_ignora_cauda_de_escrita_interrompida(tmp_path):
+    gestor = GestorPersistente(str(tmp_path))
+    _popular(gestor)
+    gestor.fechar()
+    with open(os.path.join(str(tmp_path), "eventos.log"), "ab") as f:
+        f.write(b"\x40\x00\x00\x00\x01")
+
+    restaurado = GestorPersistente(str(tmp_path))
+    restaurado.criar_demanda("Decoração", "Flores", 2)
+    restaurado.fechar()
+
+    assert [d.nome for d in GestorPersistente(str(tmp_path)).demandas] == [
+        "Buffet", "Fotografia", "Decoração"
+    ]
+
+def test_log_com_cabecalho_incompleto(tmp_path):
+    # Queda logo depois da compactação, no meio da gravação do cabeçalho do log novo
+    gestor = GestorPersistente(str(tmp_path))
+    _popular(gestor)
+    gestor.compactar()
+    gestor.fechar()
+    caminho_log = os.path.join(str(tmp_path), "eventos.log")
+    with open(caminho_log, "r+b") as f:
+        f.truncate(5)
+
+    restaurado = GestorPersistente(str(tmp_path))
+    restaurado.criar_demanda("Decoração", "Flores", 2)
+    restaurado.fechar()
+
+    assert [d.nome for d in GestorPersistente(str(tmp_path)).demandas] == [
+        "Buffet", "Fotografia", "Decoração"
+    ]
+
+def test_descarta_log_anterior_ao_snapshot(tmp_path):
+    # Queda entre o rename do snapshot e a criação do log novo
+    gestor = GestorPersistente(str(tmp_path))
+    _popular(gestor)
+    gestor.fechar()
+    caminho_log = os.path.join(str(tmp_path), "eventos.log")
+    with open(caminho_log, "rb") as f:
+        log_antigo = f.read()
+    gestor = GestorPersistente(str(tmp_path))
+    gestor.compactar()
+    gestor.fechar()
+    with open(caminho_log, "wb") as f:
+        f.write(log_antigo)
+
+    restaurado = GestorPersistente(str(tmp_path))
+    assert [d.nome for d in restaurado.demandas] == ["Buffet", "Fotografia"]
+    assert restaurado.controle_financeiro.saldo == Dinheiro.de_texto("27.000,00")
+    restaurado.fechar()
+
+def test_recusa_log_mais_novo_que_o_snapshot(tmp_path):
+    # O snapshot da compactação se perdeu (ou um antigo foi copiado por cima)
+    gestor = GestorPersistente(str(tmp_path))
+    _popular(gestor)
+    gestor.compactar()
+    gestor.criar_demanda("Decoração", "Flores", 2)
+    gestor.fechar()
+    os.remove(os.path.join(str(tmp_path), "estado.snap"))
+    caminho_log = os.path.join(str(tmp_path), "eventos.log")
+    tamanho = os.path.getsize(caminho_log)
+
+    with pytest.raises(ValueError, match="geração 1"):
+        GestorPersistente(str(tmp_path))
+    assert os.path.getsize(caminho_log) == tamanho
@@ -0,0 +1,38 @@
+import time
+
+from cache import CacheConsultas
+from prefetch import AgendadorPrefetch
+
+def _esperar_prefetch(cache, carregados):
+    limite = time.time() + 2
+    while cache.metricas.prefetch_carregados < carregados and time.time() < limite:
+        time.sleep(0.01)
+
+def test_reruns_na_mesma_pagina_nao_refazem_prefetch():
+    cache = CacheConsultas()
+    cargas = []
+
+    def carregar_gastos():
+        cargas.append("gastos")
+        return []  # tabela vazia também é resultado
+
+    agendador = AgendadorPrefetch(cache, {
+        "Demandas": [("demandas", lambda: ["d1"], [("Demandas", None)])],
+        "Relatório Financeiro": [("gastos", carregar_gastos, [("Gastos", None)])],
+    })
+
+    agendador.pagina_exibida("Demandas")
+    _esperar_prefetch(cache, 1)
+    for _ in range(10):
+        agendador.pagina_exibida("Demandas")
+    assert cache.obter("gastos", lambda: ["não usado"], []) == []
+
+    assert cargas == ["gastos"]
+    assert cache.metricas.prefetch_usados == 1
+    assert cache.metricas.prefetch_desperdicados == 0
+
+    # Mudar de página agenda as outras páginas (demandas ainda não está no cache)
+    agendador.pagina_exibida("Relatório Financeiro")
+    _esperar_prefetch(cache, 2)
+    assert cache.obter("demandas", lambda: ["não usado"], []) == ["d1"]
+    assert agendador.paginas_provaveis("Demandas") == ["Relatório Financeiro"]
@@ -0,0 +1,179 @@
+import sqlite3
+
+import pytest
+
+from database import DatabaseComFalhas
+from dinheiro import Dinheiro
+from resiliencia import (
+    ABERTO, FECHADO, MEIO_ABERTO, BancoIndisponivel, Politica, Resiliencia, transitorio
+)
+
+class ErroOdbc(Exception):
+    pass
+
+class Relogio:
+    def __init__(self):
+        self.agora = 0.0
+
+    def __call__(self):
+        return self.agora
+
+class Conexao:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+def _resiliencia(relogio=None, esperas=None, **politica):
+    return Resiliencia(
+        Politica(**politica), relogio=relogio or Relogio(),
+        dormir=(esperas.append if esperas is not None else lambda s: None),
+        aleatorio=lambda: 1.0
+    )
+
+def _falha(sqlstate="08001"):
+    def conectar():
+        raise ErroOdbc(sqlstate, f"[{sqlstate}] falha")
+    return conectar
+
+def test_classifica_erros_transitorios():
+    assert transitorio(ErroOdbc("08S01", "link caído"))
+    assert transitorio(ErroOdbc("HYT00", "timeout"))
+    assert transitorio(ErroOdbc("42000", "Database is not currently available. (40613)"))
+    assert transitorio(sqlite3.OperationalError("database is locked"))
+    assert not transitorio(ErroOdbc("28000", "Login failed for user"))
+    assert not transitorio(BancoIndisponivel())
+
+def test_repete_com_espera_exponencial_limitada():
+    esperas = []
+    resiliencia = _resiliencia(esperas=esperas, tentativas=4, espera_base=0.5, espera_maxima=1.5)
+    tentativas = []
+
+    def conectar():
+        tentativas.append(1)
+        if len(tentativas) < 4:
+            raise ErroOdbc("08S01", "link caído")
+        return Conexao()
+
+    with resiliencia.conectar(conectar):
+        pass
+    assert esperas == [0.5, 1.0, 1.5]
+    assert resiliencia.metricas.retentativas == 3
+    assert resiliencia.estado == FECHADO
+
+def test_erro_permanente_nao_repete():
+    resiliencia = _resiliencia()
+    with pytest.raises(ErroOdbc):
+        resiliencia.conectar(_falha("28000"))
+    assert resiliencia.metricas.retentativas == 0
+    assert resiliencia.metricas.falhas_permanentes == 1
+
+def test_disjuntor_abre_falha_rapido_e_fecha_apos_sondagem():
+    relogio = Relogio()
+    resiliencia = _resiliencia(relogio, tentativas=2, falhas_para_abrir=4, espera_disjuntor=30)
+    for _ in range(2):
+        with pytest.raises(ErroOdbc):
+            resiliencia.conectar(_falha())
+    assert resiliencia.estado == ABERTO
+
+    with pytest.raises(BancoIndisponivel):
+        resiliencia.conectar(lambda: pytest.fail("não deveria conectar"))
+    assert resiliencia.metricas.rejeitadas == 1
+
+    relogio.agora = 31
+    assert resiliencia.estado == MEIO_ABERTO
+    # A sondagem que falha reabre na hora, sem novas tentativas
+    with pytest.raises(ErroOdbc):
+        resiliencia.conectar(_falha())
+    assert resiliencia.estado == ABERTO
+
+    relogio.agora = 62
+    conn = resiliencia.conectar(Conexao)
+    # Só uma sondagem por vez
+    with pytest.raises(BancoIndisponivel):
+        resiliencia.conectar(Conexao)
+    with conn:
+        pass
+    assert resiliencia.estado == FECHADO
+    assert resiliencia.metricas.aberturas == 2
+
+def test_timeout_de_consulta_conta_para_o_disjuntor():
+    resiliencia = _resiliencia(falhas_para_abrir=2)
+    for _ in range(2):
+        with pytest.raises(ErroOdbc):
+            with resiliencia.conectar(Conexao):
+                raise ErroOdbc("HYT00", "Query timeout expired")
+    assert resiliencia.estado == ABERTO
+
+def test_database_com_falhas(tmp_path):
+    relogio = Relogio()
+    db = DatabaseComFalhas(str(tmp_path / "cazar.db"))
+    db.resiliencia = _resiliencia(relogio, tentativas=3, falhas_para_abrir=3)
+    assert db.inserir_gasto("Flores", Dinheiro.de_texto("800,00"))
+
+    db.fora_do_ar = True
+    assert db.obter_gastos() is None
+    assert not db.disponivel
+    assert db.obter_gastos() is None
+    assert db.resiliencia.metricas.rejeitadas == 1
+
+    db.fora_do_ar = False
+    relogio.agora = 31
+    assert [g.descricao for g in db.obter_gastos()] == ["Flores"]
+    assert db.disponivel
+
+def test_politica_do_ambiente_tem_ao_menos_uma_tentativa(monkeypatch):
+    monkeypatch.setenv("CAZAR_TENTATIVAS", "0")
+    resiliencia = Resiliencia(Politica.do_ambiente())
+    with resiliencia.conectar(Conexao):
+        pass
+    assert resiliencia.metricas.conexoes == 1
+
+def _falhar_uma_vez(db, sqlstate):
+    # Só a próxima instrução falha; o resto segue a injeção normal
+    falhar = db._falhar
+    falhas = []
+
+    def falhar_uma_vez(estado, mensagem):
+        if estado == sqlstate and not falhas:
+            falhas.append(estado)
+            raise ErroOdbc(estado, f"[{estado}] {mensagem}")
+        falhar(estado, mensagem)
+    db._falhar = falhar_uma_vez
+    return falhas
+
+def test_leitura_repete_instrucao_com_falha_transitoria(tmp_path):
+    esperas = []
+    db = DatabaseComFalhas(str(tmp_path / "cazar.db"))
+    db.resiliencia = _resiliencia(esperas=esperas, tentativas=3)
+    assert db.inserir_gasto("Flores", Dinheiro.de_texto("800,00"))
+
+    falhas = _falhar_uma_vez(db, "08S01")
+    assert [g.descricao for g in db.obter_gastos()] == ["Flores"]
+    assert falhas == ["08S01"]
+    assert db.resiliencia.metricas.retentativas == 1
+    assert esperas == [0.2]
+    assert db.disponivel
+
+def test_escrita_nao_e_repetida(tmp_path):
+    db = DatabaseComFalhas(str(tmp_path / "cazar.db"))
+    db.resiliencia = _resiliencia(tentativas=3)
+
+    _falhar_uma_vez(db, "08S01")
+    assert not db.inserir_gasto("Flores", Dinheiro.de_texto("800,00"))
+    assert db.resiliencia.metricas.retentativas == 0
+    assert db.obter_gastos() == []
+
+def test_leitura_nao_repete_com_disjuntor_aberto():
+    resiliencia = _resiliencia(tentativas=3, falhas_para_abrir=1)
+    leituras = []
+
+    def ler(conn):
+        leituras.append(1)
+        raise ErroOdbc("HYT00", "Query timeout expired")
+
+    with pytest.raises(ErroOdbc):
+        resiliencia.executar_leitura(Conexao, ler)
+    assert len(leituras) == 1
+    assert resiliencia.estado == ABERTO
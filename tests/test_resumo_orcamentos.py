@@ -0,0 +1,58 @@
+from database import DatabaseLocal
+from dinheiro import Dinheiro
+
+def _banco(tmp_path):
+    db = DatabaseLocal(str(tmp_path / "cazar.db"))
+    for nome in ("Buffet", "Fotografia", "Flores"):
+        db.inserir_demanda(nome, "", "Média")
+    return db
+
+def _orcar(db, demanda_id, *valores):
+    for valor in valores:
+        assert db.inserir_orcamento(demanda_id, "Fornecedor", "", Dinheiro.de_texto(valor))
+
+def _ids_orcamentos(db, demanda_id):
+    return sorted(o.id for o in db.obter_orcamentos_por_demanda(demanda_id))
+
+def test_resumo_incremental(tmp_path):
+    db = _banco(tmp_path)
+    _orcar(db, 1, "300,00", "250,00", "400,00", "250,00")
+    _orcar(db, 2, "90,00")
+
+    resumo = db.obter_resumo_orcamentos(1)
+    ids = _ids_orcamentos(db, 1)
+    assert resumo.quantidade == 4
+    assert resumo.valor_minimo == Dinheiro.de_texto("250,00")
+    assert resumo.valor_maximo == Dinheiro.de_texto("400,00")
+    assert resumo.valor_total == Dinheiro.de_texto("1.200,00")
+    # Empate no menor valor: fica o orçamento mais antigo
+    assert resumo.orcamento_mais_barato_id == ids[1]
+    assert db.obter_resumo_orcamentos(2).orcamento_mais_barato_id == _ids_orcamentos(db, 2)[0]
+    assert db.obter_resumo_orcamentos(3) is None
+    assert db.verificar_resumos(reconstruir=False) == []
+
+def test_exclusoes_removem_resumo(tmp_path):
+    db = _banco(tmp_path)
+    for demanda_id in (1, 2, 3):
+        _orcar(db, demanda_id, "100,00", "50,00")
+
+    assert db.excluir_demanda(1)
+    resultado = db.deletar_demandas(filtro={"nome": "Fotografia"})
+    assert (resultado.demandas, resultado.orcamentos) == (1, 2)
+
+    assert set(db.obter_resumos_orcamentos()) == {3}
+    assert db.verificar_resumos(reconstruir=False) == []
+
+def test_verificar_resumos_detecta_e_reconstroi(tmp_path):
+    db = _banco(tmp_path)
+    _orcar(db, 1, "100,00", "80,00")
+    _orcar(db, 2, "70,00")
+    with db.get_connection() as conn:
+        conn.execute("UPDATE ResumoOrcamentos SET quantidade = 7 WHERE demanda_id = 1")
+        conn.execute("DELETE FROM ResumoOrcamentos WHERE demanda_id = 2")
+        conn.commit()
+
+    assert db.verificar_resumos() == [1, 2]
+    assert db.verificar_resumos(reconstruir=False) == []
+    assert db.obter_resumo_orcamentos(1).quantidade == 2
+    assert db.obter_resumo_orcamentos(2).valor_total == Dinheiro.de_texto("70,00")